@@ -2,66 +2,154 @@
 import os
 import sys
 from pathlib import Path
-import matplotlib.pyplot as plt
 import numpy as np
 from collections import defaultdict
 import re
+import mmap
 import datetime
 
 # Add the current directory to the path so we can import common_utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import common_utils
 
+# Hyperscan is optional; without it dates are matched with the re module
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Date patterns to look for (simple version)
+DATE_PATTERN = r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}'
+# Dates are matched on UTF-8 bytes. Bytes patterns only know ASCII whitespace,
+# so also accept the encoded no-break space MediaWiki emits for &nbsp;
+_DATE_RE = re.compile(DATE_PATTERN.replace(r'\s', r'(?:\s|\xc2\xa0)').encode(), re.IGNORECASE)
+
+_CONTENT_MARKER = b'Content:\n'
+# Deleting UTF-8 continuation bytes leaves exactly one byte per character
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+_date_database = None
+
+def _get_date_database():
+    """Compile the date pattern into a Hyperscan database once per process."""
+    global _date_database
+    if _date_database is None:
+        _date_database = hyperscan.Database()
+        _date_database.compile(
+            expressions=[DATE_PATTERN.encode()],
+            ids=[0],
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST |
+                   hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP]
+        )
+    return _date_database
+
+def find_dates(content):
+    """Return the dates mentioned in UTF-8 encoded content, in order of appearance."""
+    if hyperscan is None:
+        return [date.decode('utf-8') for date in _DATE_RE.findall(content)]
+    
+    spans = []
+    
+    def on_match(match_id, start, end, flags, context):
+        spans.append((start, end))
+    
+    _get_date_database().scan(content, match_event_handler=on_match)
+    
+    # Hyperscan reports every match; keep the leftmost non-overlapping ones like re.findall
+    dates = []
+    last_end = 0
+    for start, end in sorted(spans):
+        if start >= last_end:
+            dates.append(content[start:end].decode('utf-8'))
+            last_end = end
+    return dates
+
 def count_total_pages():
     """Count the total number of wiki pages crawled."""
     files = common_utils.list_wiki_files()
     return len(files)
 
-def calculate_total_content_size():
-    """Calculate the total size of all content in bytes and MB."""
-    total_bytes = 0
-    files = common_utils.list_wiki_files()
+def _extract_metrics(file_path):
+    """Map a wiki file and return the per-file values used by the metrics.
+
+    Works on the raw bytes without decoding the page: dates are matched on
+    the UTF-8 content and only the matches are decoded, and the content
+    length in characters is counted from the bytes.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        content = b''
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = mm.find(_CONTENT_MARKER)
+                if start != -1:
+                    content = mm[start + len(_CONTENT_MARKER):]
     
-    for file_path in files:
-        total_bytes += file_path.stat().st_size
+    return {
+        'size': size,
+        'length': len(content.translate(None, _UTF8_CONTINUATION_BYTES)),
+        'dates': find_dates(content) if content else []
+    }
+
+def collect_file_metrics(files=None):
+    """Scan all wiki files in parallel and return one metrics record per file."""
+    return list(common_utils.map_wiki_files(_extract_metrics, files))
+
+def calculate_total_content_size(records=None):
+    """Calculate the total size of all content in bytes and MB."""
+    if records is None:
+        records = collect_file_metrics()
+    sizes = np.fromiter((record['size'] for record in records),
+                        dtype=np.int64, count=len(records))
+    total_bytes = int(sizes.sum())
     
     return {
         'bytes': total_bytes,
         'megabytes': total_bytes / (1024 * 1024)
     }
 
-def analyze_content_length_distribution():
-    """Analyze the distribution of content lengths."""
-    files = common_utils.list_wiki_files()
-    lengths = []
-    
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        if wiki_data['content']:
-            lengths.append(len(wiki_data['content']))
+def analyze_content_length_distribution(records=None, exact=True):
+    """Analyze the distribution of content lengths.
+
+    With exact=False the file sizes from stat() are used instead of the
+    parsed content lengths, so no file has to be read. The values are then
+    whole-file sizes in bytes (header and categories included), which is a
+    close proxy for the mostly-ASCII wiki text.
+    """
+    if exact:
+        if records is None:
+            records = collect_file_metrics()
+        lengths = np.fromiter((record['length'] for record in records),
+                              dtype=np.int64, count=len(records))
+    elif records is None:
+        files = common_utils.list_wiki_files()
+        lengths = np.fromiter((file_path.stat().st_size for file_path in files),
+                              dtype=np.int64, count=len(files))
+    else:
+        lengths = np.fromiter((record['size'] for record in records),
+                              dtype=np.int64, count=len(records))
+    lengths = lengths[lengths > 0]
+    # Upper median via linear-time selection rather than a full sort
+    k = lengths.size // 2
     
     return {
-        'count': len(lengths),
-        'min': min(lengths) if lengths else 0,
-        'max': max(lengths) if lengths else 0,
-        'mean': sum(lengths) / len(lengths) if lengths else 0,
-        'median': sorted(lengths)[len(lengths)//2] if lengths else 0,
-        'histogram_data': lengths
+        'count': int(lengths.size),
+        'min': int(lengths.min()) if lengths.size else 0,
+        'max': int(lengths.max()) if lengths.size else 0,
+        'mean': float(lengths.mean()) if lengths.size else 0,
+        'median': int(np.partition(lengths, k)[k]) if lengths.size else 0,
+        'histogram_data': lengths,
+        'unit': 'characters' if exact else 'bytes'
     }
 
-def detect_date_ranges():
+def detect_date_ranges(records=None):
     """Detect date ranges mentioned in the content."""
-    files = common_utils.list_wiki_files()
-    # Date patterns to look for (simple version)
-    date_pattern = r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}'
-    
+    if records is None:
+        records = collect_file_metrics()
     all_dates = []
     
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        if wiki_data['content']:
-            dates = re.findall(date_pattern, wiki_data['content'], re.IGNORECASE)
-            all_dates.extend(dates)
+    for record in records:
+        all_dates.extend(record['dates'])
     
     return {
         'total_dates_found': len(all_dates),
@@ -69,22 +157,26 @@ def detect_date_ranges():
         'sample_dates': list(set(all_dates))[:20] if all_dates else []
     }
 
-def plot_content_length_distribution(lengths):
+def plot_content_length_distribution(lengths, unit='characters'):
     """Plot the distribution of content lengths."""
+    plt = common_utils.get_pyplot()
+    counts, edges = np.histogram(lengths, bins=30)
+    mean_length = float(np.mean(lengths))
+    
     plt.figure(figsize=(10, 6))
-    plt.hist(lengths, bins=30, alpha=0.7, color='blue')
-    plt.xlabel('Content Length (characters)')
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align='edge', alpha=0.7, color='blue')
+    plt.xlabel(f'Content Length ({unit})')
     plt.ylabel('Frequency')
     plt.title('Distribution of Wiki Page Content Lengths')
-    plt.axvline(np.mean(lengths), color='red', linestyle='dashed', linewidth=1)
-    plt.text(np.mean(lengths)*1.1, plt.ylim()[1]*0.9, f'Mean: {int(np.mean(lengths))}')
+    plt.axvline(mean_length, color='red', linestyle='dashed', linewidth=1)
+    plt.text(mean_length*1.1, plt.ylim()[1]*0.9, f'Mean: {int(mean_length)}')
     plt.grid(True, alpha=0.3)
     
     # Save the plot
     plot_path = Path('content_length_distribution.png')
     plt.savefig(plot_path)
     print(f"Plot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
 
 def main():
     """Run the basic metrics analysis."""
@@ -94,25 +186,28 @@ def main():
     total_pages = count_total_pages()
     print(f"Total pages crawled: {total_pages}")
     
+    # Read and parse every file once, in parallel, for all the metrics below
+    records = collect_file_metrics()
+    
     # Calculate total content size
-    size_info = calculate_total_content_size()
+    size_info = calculate_total_content_size(records)
     print(f"Total content size: {size_info['bytes']} bytes ({size_info['megabytes']:.2f} MB)")
     
     # Analyze content length distribution
-    length_data = analyze_content_length_distribution()
+    length_data = analyze_content_length_distribution(records)
     print("\nContent Length Distribution:")
     print(f"  Count: {length_data['count']}")
-    print(f"  Min: {length_data['min']} characters")
-    print(f"  Max: {length_data['max']} characters")
-    print(f"  Mean: {length_data['mean']:.2f} characters")
-    print(f"  Median: {length_data['median']} characters")
+    print(f"  Min: {length_data['min']} {length_data['unit']}")
+    print(f"  Max: {length_data['max']} {length_data['unit']}")
+    print(f"  Mean: {length_data['mean']:.2f} {length_data['unit']}")
+    print(f"  Median: {length_data['median']} {length_data['unit']}")
     
     # Plot the content length distribution
-    if length_data['histogram_data']:
-        plot_content_length_distribution(length_data['histogram_data'])
+    if length_data['histogram_data'].size:
+        plot_content_length_distribution(length_data['histogram_data'], length_data['unit'])
     
     # Detect date ranges
-    date_info = detect_date_ranges()
+    date_info = detect_date_ranges(records)
     print("\nDate Detection:")
     print(f"  Total dates found: {date_info['total_dates_found']}")
     print(f"  Unique dates: {date_info['unique_dates']}")
@@ -2,48 +2,117 @@
 import os
 import sys
 from pathlib import Path
-import matplotlib.pyplot as plt
 from collections import Counter, defaultdict
 import numpy as np
-import re
+import functools
 
 # Add the current directory to the path so we can import common_utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import common_utils
 
-def analyze_natural_breakpoints():
+# Numba is optional; without it the chunk-count kernel runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        return lambda func: func
+
+DEFAULT_CHUNK_SIZES = [500, 1000, 2000, 5000, 10000]
+
+@njit(cache=True)
+def count_chunks_multi(para_lengths, chunk_sizes):
+    """Count the chunks simple paragraph chunking produces for each chunk size.
+
+    A paragraph joins the current chunk while the chunk length plus the
+    paragraph length fits the limit; each paragraph adds its length plus the
+    two-newline separator to the chunk.
+    """
+    counts = np.zeros(chunk_sizes.shape[0], dtype=np.int64)
+    for i in range(chunk_sizes.shape[0]):
+        limit = chunk_sizes[i]
+        current = 0
+        count = 0
+        for length in para_lengths:
+            if current + length <= limit:
+                current += length + 2
+            else:
+                if current > 0:
+                    count += 1
+                current = length + 2
+        if current > 0:
+            count += 1
+        counts[i] = count
+    return counts
+
+def _extract_chunking_stats(file_path, chunk_sizes=DEFAULT_CHUNK_SIZES):
+    """Parse a wiki file once and return its breakpoint and chunk-count statistics."""
+    wiki_data = common_utils.read_wiki_file(file_path)
+    content = wiki_data.get('content', '')
+    
+    if not content:
+        return None
+    
+    record = {}
+    
+    # Count sections and their total length in one pass
+    section_count = 0
+    section_chars = 0
+    for _, section_content in common_utils.extract_sections(content):
+        section_count += 1
+        section_chars += len(section_content)
+    record['section_count'] = section_count
+    
+    # Calculate average section length
+    if section_count:
+        record['avg_section_length'] = section_chars / section_count
+    
+    # Split paragraphs once for both the breakpoint and chunking statistics
+    paragraphs = common_utils.split_paragraphs(content)
+    para_lengths = np.fromiter(map(len, paragraphs), dtype=np.int64, count=len(paragraphs))
+    record['paragraph_count'] = len(paragraphs)
+    
+    # Calculate average paragraph length
+    if paragraphs:
+        record['avg_paragraph_length'] = para_lengths.sum() / len(paragraphs)
+    
+    # Count chunks for all sizes in one kernel call over the paragraph lengths
+    chunk_counts = count_chunks_multi(para_lengths, np.asarray(chunk_sizes, dtype=np.int64))
+    record['chunk_counts'] = dict(zip(chunk_sizes, chunk_counts.tolist()))
+    
+    return record
+
+def collect_chunking_stats(chunk_sizes=DEFAULT_CHUNK_SIZES, files=None):
+    """Scan all wiki files in parallel and return one record per page with content."""
+    worker = functools.partial(_extract_chunking_stats, chunk_sizes=chunk_sizes)
+    return [record for record in common_utils.map_wiki_files(worker, files)
+            if record is not None]
+
+def analyze_natural_breakpoints(records=None):
     """Analyze natural breakpoints in content (sections, paragraphs, etc.)."""
-    files = common_utils.list_wiki_files()
-    section_counts = []
-    paragraph_counts = []
-    avg_section_lengths = []
-    avg_paragraph_lengths = []
-    
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        content = wiki_data.get('content', '')
-        
-        if not content:
-            continue
-        
-        # Count sections
-        sections = common_utils.extract_sections(content)
-        section_counts.append(len(sections))
-        
-        # Calculate average section length
-        if sections:
-            section_lengths = [len(section[1]) for section in sections]
-            avg_section_lengths.append(sum(section_lengths) / len(section_lengths))
-        
-        # Count paragraphs
-        paragraphs = re.split(r'\n\n+', content)
-        paragraphs = [p for p in paragraphs if p.strip()]
-        paragraph_counts.append(len(paragraphs))
-        
-        # Calculate average paragraph length
-        if paragraphs:
-            para_lengths = [len(p) for p in paragraphs]
-            avg_paragraph_lengths.append(sum(para_lengths) / len(para_lengths))
+    if records is None:
+        records = collect_chunking_stats()
+    n = len(records)
+    section_counts = np.empty(n, dtype=np.int64)
+    paragraph_counts = np.empty(n, dtype=np.int64)
+    avg_section_lengths = np.empty(n, dtype=np.float64)
+    avg_paragraph_lengths = np.empty(n, dtype=np.float64)
+    section_idx = 0
+    paragraph_idx = 0
+    
+    for i, record in enumerate(records):
+        section_counts[i] = record['section_count']
+        paragraph_counts[i] = record['paragraph_count']
+        if 'avg_section_length' in record:
+            avg_section_lengths[section_idx] = record['avg_section_length']
+            section_idx += 1
+        if 'avg_paragraph_length' in record:
+            avg_paragraph_lengths[paragraph_idx] = record['avg_paragraph_length']
+            paragraph_idx += 1
+    
+    # Pages without sections or paragraphs have no average length
+    avg_section_lengths = avg_section_lengths[:section_idx]
+    avg_paragraph_lengths = avg_paragraph_lengths[:paragraph_idx]
     
     return {
         'section_counts': section_counts,
@@ -52,50 +121,23 @@ def analyze_natural_breakpoints():
         'avg_paragraph_lengths': avg_paragraph_lengths
     }
 
-def simulate_different_chunk_sizes(chunk_sizes=[500, 1000, 2000, 5000, 10000]):
+def simulate_different_chunk_sizes(chunk_sizes=DEFAULT_CHUNK_SIZES, records=None):
     """Simulate different chunking strategies and analyze coverage."""
-    files = common_utils.list_wiki_files()
+    if records is None:
+        records = collect_chunking_stats(chunk_sizes)
     results = {}
     
     # Collect overall statistics
-    total_pages = 0
+    total_pages = len(records)
     total_chunks_by_size = {size: 0 for size in chunk_sizes}
     chunks_per_page_by_size = {size: [] for size in chunk_sizes}
     
     # Collect statistics about chunk sizes
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        content = wiki_data.get('content', '')
-        
-        if not content:
-            continue
-        
-        total_pages += 1
-        
-        # Try different chunk sizes
+    for record in records:
         for chunk_size in chunk_sizes:
-            chunks = []
-            current_chunk = ""
-            
-            # Simple chunking by paragraph with size limit
-            paragraphs = re.split(r'\n\n+', content)
-            
-            for para in paragraphs:
-                if not para.strip():
-                    continue
-                
-                if len(current_chunk) + len(para) <= chunk_size:
-                    current_chunk += para + "\n\n"
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = para + "\n\n"
-            
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            
-            total_chunks_by_size[chunk_size] += len(chunks)
-            chunks_per_page_by_size[chunk_size].append(len(chunks))
+            chunk_count = record['chunk_counts'][chunk_size]
+            total_chunks_by_size[chunk_size] += chunk_count
+            chunks_per_page_by_size[chunk_size].append(chunk_count)
     
     # Calculate averages and distributions
     for size in chunk_sizes:
@@ -147,30 +189,36 @@ def estimate_database_impact(chunking_results):
     
     return db_size_estimates
 
+def _plot_histogram(ax, values, bins, color):
+    """Draw a histogram on ax from counts binned once with np.histogram."""
+    counts, edges = np.histogram(values, bins=bins)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color=color, alpha=0.7)
+
 def plot_breakpoint_statistics(breakpoint_data):
     """Plot statistics about natural breakpoints."""
+    plt = common_utils.get_pyplot()
     fig, axs = plt.subplots(2, 2, figsize=(12, 10))
     
     # Plot section count distribution
-    axs[0, 0].hist(breakpoint_data['section_counts'], bins=20, color='blue', alpha=0.7)
+    _plot_histogram(axs[0, 0], breakpoint_data['section_counts'], bins=20, color='blue')
     axs[0, 0].set_title('Distribution of Section Counts per Page')
     axs[0, 0].set_xlabel('Number of Sections')
     axs[0, 0].set_ylabel('Frequency')
     
     # Plot section length distribution
-    axs[0, 1].hist(breakpoint_data['avg_section_lengths'], bins=20, color='green', alpha=0.7)
+    _plot_histogram(axs[0, 1], breakpoint_data['avg_section_lengths'], bins=20, color='green')
     axs[0, 1].set_title('Distribution of Average Section Lengths')
     axs[0, 1].set_xlabel('Average Section Length (characters)')
     axs[0, 1].set_ylabel('Frequency')
     
     # Plot paragraph count distribution
-    axs[1, 0].hist(breakpoint_data['paragraph_counts'], bins=20, color='red', alpha=0.7)
+    _plot_histogram(axs[1, 0], breakpoint_data['paragraph_counts'], bins=20, color='red')
     axs[1, 0].set_title('Distribution of Paragraph Counts per Page')
     axs[1, 0].set_xlabel('Number of Paragraphs')
     axs[1, 0].set_ylabel('Frequency')
     
     # Plot paragraph length distribution
-    axs[1, 1].hist(breakpoint_data['avg_paragraph_lengths'], bins=20, color='purple', alpha=0.7)
+    _plot_histogram(axs[1, 1], breakpoint_data['avg_paragraph_lengths'], bins=20, color='purple')
     axs[1, 1].set_title('Distribution of Average Paragraph Lengths')
     axs[1, 1].set_xlabel('Average Paragraph Length (characters)')
     axs[1, 1].set_ylabel('Frequency')
@@ -179,10 +227,11 @@ def plot_breakpoint_statistics(breakpoint_data):
     plot_path = Path('breakpoint_statistics.png')
     plt.savefig(plot_path)
     print(f"Breakpoint statistics plot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
 
 def plot_chunking_comparison(chunking_results):
     """Plot comparison of different chunking strategies."""
+    plt = common_utils.get_pyplot()
     chunk_sizes = list(chunking_results.keys())
     total_chunks = [chunking_results[size]['total_chunks'] for size in chunk_sizes]
     avg_chunks_per_page = [chunking_results[size]['avg_chunks_per_page'] for size in chunk_sizes]
@@ -209,10 +258,11 @@ def plot_chunking_comparison(chunking_results):
     plot_path = Path('chunking_comparison.png')
     plt.savefig(plot_path)
     print(f"Chunking comparison plot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
 
 def plot_database_impact(db_size_estimates):
     """Plot database size impact of different chunking strategies."""
+    plt = common_utils.get_pyplot()
     chunk_sizes = list(db_size_estimates.keys())
     total_sizes = [db_size_estimates[size]['total_mb'] for size in chunk_sizes]
     
@@ -239,15 +289,20 @@ def plot_database_impact(db_size_estimates):
     plot_path = Path('database_impact.png')
     plt.savefig(plot_path)
     print(f"Database impact plot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
 
 def main():
     """Run the chunking strategy analysis."""
     print("=== Chunking Strategy Analysis ===")
     
+    # Read and parse every file once, in parallel, for both analyses below
+    print("Scanning wiki files...")
+    chunk_sizes = [500, 1000, 2000, 3000, 5000, 10000]
+    records = collect_chunking_stats(chunk_sizes)
+    
     # Analyze natural breakpoints
     print("Analyzing natural breakpoints in content...")
-    breakpoint_data = analyze_natural_breakpoints()
+    breakpoint_data = analyze_natural_breakpoints(records)
     
     # Display summary statistics
     print("\nNatural Breakpoint Statistics:")
@@ -263,8 +318,7 @@ def main():
     
     # Simulate different chunk sizes
     print("\nSimulating different chunking strategies...")
-    chunk_sizes = [500, 1000, 2000, 3000, 5000, 10000]
-    chunking_results = simulate_different_chunk_sizes(chunk_sizes)
+    chunking_results = simulate_different_chunk_sizes(chunk_sizes, records)
     
     # Display chunking results
     print("\nChunking Strategy Results:")
@@ -2,7 +2,6 @@
 import os
 import sys
 from pathlib import Path
-import matplotlib.pyplot as plt
 from collections import Counter, defaultdict
 import re
 import nltk
@@ -13,7 +12,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import common_utils
 
 # Define categories to blacklist
-CATEGORY_BLACKLIST = ['Categories', 'Category']
+CATEGORY_BLACKLIST = frozenset({'Categories', 'Category'})
+
+# Whole words made only of letters (no digits or underscores), at least 3 long
+_WORD_RE = re.compile(r'\b[^\W\d_]{3,}\b')
 
 # Download necessary NLTK data
 try:
@@ -21,96 +23,67 @@ try:
 except LookupError:
     nltk.download('stopwords')
 
-def extract_categories():
+# Loaded once at import and shared by every worker
+_STOP_WORDS = frozenset(stopwords.words('english'))
+
+def _extract_terms(file_path):
+    """Parse a wiki file once and return its meaningful categories and keyword counts."""
+    wiki_data = common_utils.read_wiki_file(file_path)
+    
+    # Skip blacklisted categories
+    categories = [cat for cat in wiki_data['categories']
+                  if cat not in CATEGORY_BLACKLIST]
+    
+    term_counts = Counter()
+    if wiki_data['content']:
+        # Alphabetic words of at least 3 letters in one regex scan, minus stopwords.
+        # Interning makes repeated words share one string object, so the hash is
+        # computed once per distinct word.
+        term_counts = Counter(sys.intern(word) for word in _WORD_RE.findall(wiki_data['content'].lower())
+                              if word not in _STOP_WORDS)
+    
+    return {'categories': categories, 'term_counts': term_counts}
+
+def collect_terms(files=None):
+    """Scan all wiki files in parallel and return one categories/term-counts record per file."""
+    return list(common_utils.map_wiki_files(_extract_terms, files))
+
+def extract_categories(records=None):
     """Extract and count all categories across wiki pages, excluding blacklisted ones."""
-    files = common_utils.list_wiki_files()
+    if records is None:
+        records = collect_terms()
     categories_counter = Counter()
     
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        for category in wiki_data['categories']:
-            # Skip blacklisted categories
-            if category not in CATEGORY_BLACKLIST:
-                categories_counter[category] += 1
+    for record in records:
+        categories_counter.update(record['categories'])
     
     return categories_counter
 
-def simple_tokenize(text):
-    """Simple word tokenization function that doesn't require punkt_tab."""
-    # Convert to lowercase and replace punctuation with spaces
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', ' ', text)
-    # Split on whitespace and filter empty strings
-    return [word for word in text.split() if word]
+def count_terms(records, top_cat_names):
+    """Count keywords across all content and per top category in a single pass.
 
-def identify_top_keywords(min_word_length=3, top_n=200):
-    """Identify top keywords across all content, excluding stopwords."""
-    files = common_utils.list_wiki_files()
+    Returns the overall word counter and a dict mapping each of top_cat_names
+    to the word counter of the pages in that category.
+    """
     word_counter = Counter()
-    stop_words = set(stopwords.words('english'))
-    
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        if wiki_data['content']:
-            # Use simple tokenization instead of nltk.word_tokenize
-            tokens = simple_tokenize(wiki_data['content'])
-            filtered_words = [
-                word for word in tokens 
-                if word.isalpha() and 
-                len(word) >= min_word_length and 
-                word not in stop_words
-            ]
-            word_counter.update(filtered_words)
-    
-    return word_counter.most_common(top_n)
-
-def generate_term_frequency_by_category(top_categories=10, top_terms=20):
-    """Generate term frequency analysis for top categories."""
-    files = common_utils.list_wiki_files()
-    
-    # Get top categories first (excluding blacklisted)
-    categories_counter = extract_categories()
-    top_cat_names = [cat for cat, _ in categories_counter.most_common(top_categories)]
-    
-    # Initialize category-specific word counters
     category_terms = {cat: Counter() for cat in top_cat_names}
-    stop_words = set(stopwords.words('english'))
+    top_cat_set = frozenset(top_cat_names)
     
-    # Process files
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        
-        # Filter out blacklisted categories from the page categories
-        page_categories = set([cat for cat in wiki_data['categories'] 
-                            if cat not in CATEGORY_BLACKLIST])
-        
-        # Check if page belongs to any top category
-        matching_categories = page_categories.intersection(top_cat_names)
+    for record in records:
+        page_counter = record['term_counts']
+        if not page_counter:
+            continue
+        word_counter.update(page_counter)
         
-        if matching_categories and wiki_data['content']:
-            # Use simple tokenization
-            tokens = simple_tokenize(wiki_data['content'])
-            filtered_words = [
-                word for word in tokens 
-                if word.isalpha() and 
-                len(word) >= 3 and 
-                word not in stop_words
-            ]
-            
-            # Update counters for each matching category
-            for category in matching_categories:
-                category_terms[category].update(filtered_words)
-    
-    # Extract top terms for each category
-    result = {}
-    for category, counter in category_terms.items():
-        result[category] = counter.most_common(top_terms)
-    
-    return result
+        # Update counters for each top category the page belongs to
+        for category in top_cat_set.intersection(record['categories']):
+            category_terms[category].update(page_counter)
+    
+    return word_counter, category_terms
 
-def plot_category_distribution(categories_counter, top_n=20):
-    """Plot the distribution of top categories."""
-    top_categories = categories_counter.most_common(top_n)
+def plot_category_distribution(top_categories):
+    """Plot the distribution of top categories, given as (category, count) pairs."""
+    plt = common_utils.get_pyplot()
     categories, counts = zip(*top_categories) if top_categories else ([], [])
     
     plt.figure(figsize=(12, 8))
@@ -125,12 +98,13 @@ def plot_category_distribution(categories_counter, top_n=20):
     plot_path = Path('category_distribution.png')
     plt.savefig(plot_path)
     print(f"Plot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
 
 def plot_keyword_cloud(keywords, top_n=100):
     """Generate and save a word cloud of top keywords."""
     try:
         from wordcloud import WordCloud
+        plt = common_utils.get_pyplot()
         
         # Create dictionary for word cloud
         word_dict = {word: count for word, count in keywords[:top_n]}
@@ -150,7 +124,7 @@ def plot_keyword_cloud(keywords, top_n=100):
         cloud_path = Path('keyword_cloud.png')
         plt.savefig(cloud_path)
         print(f"Word cloud saved to {cloud_path.absolute()}")
-        plt.close()
+        plt.close('all')
     except ImportError:
         print("WordCloud package not installed. Install with: pip install wordcloud")
         print("Top 30 keywords:")
@@ -161,27 +135,34 @@ def main():
     """Run the content analysis."""
     print("=== Content Analysis ===")
     
+    # Read, parse and tokenize every file once, in parallel, for all analyses below
+    print("Scanning wiki files...")
+    records = collect_terms()
+    
     # Extract categories (excluding blacklisted ones)
     print("Analyzing categories...")
-    categories_counter = extract_categories()
+    categories_counter = extract_categories(records)
     total_categories = len(categories_counter)
     total_categorized_pages = sum(categories_counter.values())
     
     print(f"Total unique categories (excluding blacklisted): {total_categories}")
     print(f"Total pages with meaningful categories: {total_categorized_pages}")
-    print(f"Blacklisted categories: {', '.join(CATEGORY_BLACKLIST)}")
+    print(f"Blacklisted categories: {', '.join(sorted(CATEGORY_BLACKLIST))}")
     
-    # Top categories
+    # Top categories, selected once and sliced for the listing, plot and term analysis
+    top_categories = categories_counter.most_common(20)
     print("\nTop 15 meaningful categories:")
-    for category, count in categories_counter.most_common(15):
+    for category, count in top_categories[:15]:
         print(f"  {category}: {count} pages")
     
     # Plot category distribution
-    plot_category_distribution(categories_counter)
+    plot_category_distribution(top_categories)
     
-    # Identify top keywords
+    # Count keywords overall and for the top categories in one pass
     print("\nAnalyzing keywords...")
-    top_keywords = identify_top_keywords()
+    top_cat_names = [cat for cat, _ in top_categories[:10]]
+    word_counter, category_counters = count_terms(records, top_cat_names)
+    top_keywords = word_counter.most_common(200)
     
     print("Top 20 keywords across all content:")
     for word, count in top_keywords[:20]:
@@ -190,9 +171,10 @@ def main():
     # Generate word cloud
     plot_keyword_cloud(top_keywords)
     
-    # Generate term frequency by category
+    # Top terms by category
     print("\nAnalyzing keywords by category...")
-    category_terms = generate_term_frequency_by_category()
+    category_terms = {cat: counter.most_common(20)
+                      for cat, counter in category_counters.items()}
     
     print("Top 10 keywords for top 5 categories:")
     for i, (category, terms) in enumerate(list(category_terms.items())[:5]):
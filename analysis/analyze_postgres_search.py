@@ -3,16 +3,34 @@ import os
 import sys
 import psycopg2
 import psycopg2.extras
-import matplotlib.pyplot as plt
-import pandas as pd
+import psycopg2.pool
 from pathlib import Path
-import time
 import json
+import argparse
+import hashlib
+import pickle
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+# Add the current directory to the path so we can import common_utils
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import common_utils
+
+# orjson is optional; without it the results are written with the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables from .env file if present
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
 
+# Search results are cached here between benchmark runs. Bump CACHE_FORMAT
+# when the cached payload changes shape
+CACHE_PATH = Path(__file__).parent / '.cache' / 'search.sqlite'
+CACHE_FORMAT = 3
+
 # Sample queries to test (same as before for comparison)
 SAMPLE_QUERIES = [
     # General OSGeo questions
@@ -46,89 +64,189 @@ SAMPLE_QUERIES = [
     "What OSGeo projects support WMS?"
 ]
 
-# Different PostgreSQL search approaches to test
+# Settings for every benchmark session: the fuzzy search threshold, plus JIT
+# compilation and cheaper parallel plans for the rank-heavy statements. JIT
+# keeps the server's jit_above_cost, as compiling costs more than it saves
+# on cheap plans and is repeated on every execution
+SESSION_SETTINGS = [
+    "pg_trgm.similarity_threshold = 0.3",
+    "jit = on",
+    "parallel_setup_cost = 0",
+    "parallel_tuple_cost = 0",
+    "max_parallel_workers_per_gather = 4",
+    "work_mem = '64MB'",
+]
+
+# Common stopwords that tsquery would ignore anyway, and the punctuation
+# stripped from queries before building a tsquery
+TSQUERY_STOPWORDS = frozenset({'a', 'an', 'the', 'is', 'are', 'was', 'were',
+                               'be', 'to', 'in', 'on', 'at', 'by', 'of', 'for', 'with'})
+TSQUERY_PUNCTUATION = str.maketrans('', '', '?.,')
+
+# Share of a query's distinct terms (lowercased, without ? and .) that occur
+# in a result's chunk text, selected alongside each result. It is computed on
+# the full chunk, while only the first 512 characters of it are returned
+TERM_COVERAGE_SQL = """coalesce((
+                SELECT avg((strpos(lower(r.chunk_text), term) > 0)::int)::float
+                FROM (
+                    SELECT DISTINCT term
+                    FROM regexp_split_to_table(translate(lower(q.qtext), '?.', ''), '\\s+') AS term
+                    WHERE term <> ''
+                ) terms
+            ), 0)"""
+
+# Different PostgreSQL search approaches to test. Each query is prepared once
+# per connection (see prepare_search_statements) and searches a whole batch of
+# queries in one round-trip: the parameters are arrays with one element per
+# query, and every query gets its own top 5 through a LATERAL subquery. The
+# text search approaches parse each query into a tsquery once, up front, for
+# both the match and the ranking. The plain text search approaches only rank
+# (with the cheaper cover density ts_rank_cd) the first 500 matching chunks
+# the tsv index returns, rather than every match
 SEARCH_APPROACHES = {
     "basic_tsquery": {
         "description": "Basic text search using to_tsquery",
-        "query": """
-            SELECT p.title, p.url, pc.chunk_text, ts_rank(pc.tsv, to_tsquery('english', %s)) AS rank
-            FROM pages p
-            JOIN page_chunks pc ON p.id = pc.page_id
-            WHERE pc.tsv @@ to_tsquery('english', %s)
-            ORDER BY rank DESC
-            LIMIT 5
+        "param_types": "text[], text[]",
+        "query": f"""
+            SELECT q.qid, r.title, r.url, left(r.chunk_text, 512) AS chunk_text, r.rank,
+                   {TERM_COVERAGE_SQL} AS term_coverage
+            FROM unnest($1, $2) WITH ORDINALITY AS q(qtext, tsquery_text, qid)
+            CROSS JOIN LATERAL to_tsquery('english', q.tsquery_text) AS t(tsq)
+            CROSS JOIN LATERAL (
+                SELECT s.title, s.url, s.chunk_text, ts_rank_cd(s.tsv, t.tsq) AS rank
+                FROM (
+                    SELECT p.title, p.url, pc.chunk_text, pc.tsv
+                    FROM pages p
+                    JOIN page_chunks pc ON p.id = pc.page_id
+                    WHERE pc.tsv @@ t.tsq
+                    LIMIT 500
+                ) s
+                ORDER BY rank DESC
+                LIMIT 5
+            ) r
+            ORDER BY q.qid, r.rank DESC
         """
     },
     "plainto_tsquery": {
         "description": "Natural language query parsing",
-        "query": """
-            SELECT p.title, p.url, pc.chunk_text, ts_rank(pc.tsv, plainto_tsquery('english', %s)) AS rank
-            FROM pages p
-            JOIN page_chunks pc ON p.id = pc.page_id
-            WHERE pc.tsv @@ plainto_tsquery('english', %s)
-            ORDER BY rank DESC
-            LIMIT 5
+        "param_types": "text[]",
+        "query": f"""
+            SELECT q.qid, r.title, r.url, left(r.chunk_text, 512) AS chunk_text, r.rank,
+                   {TERM_COVERAGE_SQL} AS term_coverage
+            FROM unnest($1) WITH ORDINALITY AS q(qtext, qid)
+            CROSS JOIN LATERAL plainto_tsquery('english', q.qtext) AS t(tsq)
+            CROSS JOIN LATERAL (
+                SELECT s.title, s.url, s.chunk_text, ts_rank_cd(s.tsv, t.tsq) AS rank
+                FROM (
+                    SELECT p.title, p.url, pc.chunk_text, pc.tsv
+                    FROM pages p
+                    JOIN page_chunks pc ON p.id = pc.page_id
+                    WHERE pc.tsv @@ t.tsq
+                    LIMIT 500
+                ) s
+                ORDER BY rank DESC
+                LIMIT 5
+            ) r
+            ORDER BY q.qid, r.rank DESC
         """
     },
     "websearch_to_tsquery": {
         "description": "Web search style query parsing",
-        "query": """
-            SELECT p.title, p.url, pc.chunk_text, ts_rank(pc.tsv, websearch_to_tsquery('english', %s)) AS rank
-            FROM pages p
-            JOIN page_chunks pc ON p.id = pc.page_id
-            WHERE pc.tsv @@ websearch_to_tsquery('english', %s)
-            ORDER BY rank DESC
-            LIMIT 5
+        "param_types": "text[]",
+        "query": f"""
+            SELECT q.qid, r.title, r.url, left(r.chunk_text, 512) AS chunk_text, r.rank,
+                   {TERM_COVERAGE_SQL} AS term_coverage
+            FROM unnest($1) WITH ORDINALITY AS q(qtext, qid)
+            CROSS JOIN LATERAL websearch_to_tsquery('english', q.qtext) AS t(tsq)
+            CROSS JOIN LATERAL (
+                SELECT s.title, s.url, s.chunk_text, ts_rank_cd(s.tsv, t.tsq) AS rank
+                FROM (
+                    SELECT p.title, p.url, pc.chunk_text, pc.tsv
+                    FROM pages p
+                    JOIN page_chunks pc ON p.id = pc.page_id
+                    WHERE pc.tsv @@ t.tsq
+                    LIMIT 500
+                ) s
+                ORDER BY rank DESC
+                LIMIT 5
+            ) r
+            ORDER BY q.qid, r.rank DESC
         """
     },
+    # Uses each page's categories as one array, from the benchmark's own
+    # materialized view (see refresh_page_categories), so chunks are not
+    # repeated once per category. The categories matching the key term are
+    # looked up once per query, through the trigram index on
+    # page_categories, and each row only tests for an overlap
     "category_boosted": {
         "description": "Search with category relevance boosting",
-        "query": """
-            SELECT p.title, p.url, pc.chunk_text, 
-                   ts_rank(pc.tsv, websearch_to_tsquery('english', %s)) + 
-                   CASE WHEN EXISTS (
-                       SELECT 1 FROM page_categories pc2 
-                       WHERE pc2.page_id = p.id 
-                       AND pc2.category_name ILIKE '%%' || %s || '%%'
-                   ) THEN 0.5 ELSE 0 END AS rank
-            FROM pages p
-            JOIN page_chunks pc ON p.id = pc.page_id
-            LEFT JOIN page_categories pc2 ON p.id = pc2.page_id
-            WHERE pc.tsv @@ websearch_to_tsquery('english', %s)
-            AND pc2.category_name NOT IN ('Categories', 'Category')
-            ORDER BY rank DESC
-            LIMIT 5
+        "param_types": "text[], text[]",
+        "query": f"""
+            SELECT q.qid, r.title, r.url, left(r.chunk_text, 512) AS chunk_text, r.rank,
+                   {TERM_COVERAGE_SQL} AS term_coverage
+            FROM unnest($1, $2) WITH ORDINALITY AS q(qtext, key_term, qid)
+            CROSS JOIN LATERAL websearch_to_tsquery('english', q.qtext) AS t(tsq)
+            CROSS JOIN LATERAL (
+                SELECT ARRAY(
+                    SELECT DISTINCT category_name FROM page_categories
+                    WHERE category_name ILIKE '%' || q.key_term || '%'
+                ) AS categories
+            ) matched
+            CROSS JOIN LATERAL (
+                SELECT p.title, p.url, pc.chunk_text, 
+                       ts_rank(pc.tsv, t.tsq) + 
+                       CASE WHEN bc.categories && matched.categories
+                       THEN 0.5 ELSE 0 END AS rank
+                FROM pages p
+                JOIN search_benchmark_page_categories bc ON bc.page_id = p.id
+                JOIN page_chunks pc ON p.id = pc.page_id
+                WHERE pc.tsv @@ t.tsq
+                ORDER BY rank DESC
+                LIMIT 5
+            ) r
+            ORDER BY q.qid, r.rank DESC
         """
     },
+    # The % operator (similarity of at least pg_trgm.similarity_threshold)
+    # can use the trigram index on chunk_text, unlike a similarity() > x filter
     "fuzzy_trigram": {
         "description": "Fuzzy search using trigram similarity",
-        "query": """
-            SELECT p.title, p.url, pc.chunk_text, 
-                similarity(pc.chunk_text, %s) AS rank
-            FROM pages p
-            JOIN page_chunks pc ON p.id = pc.page_id
-            WHERE similarity(pc.chunk_text, %s) > 0.3
-            ORDER BY rank DESC
-            LIMIT 5
+        "param_types": "text[]",
+        "query": f"""
+            SELECT q.qid, r.title, r.url, left(r.chunk_text, 512) AS chunk_text, r.rank,
+                   {TERM_COVERAGE_SQL} AS term_coverage
+            FROM unnest($1) WITH ORDINALITY AS q(qtext, qid)
+            CROSS JOIN LATERAL (
+                SELECT p.title, p.url, pc.chunk_text, 
+                    similarity(pc.chunk_text, q.qtext) AS rank
+                FROM pages p
+                JOIN page_chunks pc ON p.id = pc.page_id
+                WHERE pc.chunk_text % q.qtext
+                ORDER BY rank DESC
+                LIMIT 5
+            ) r
+            ORDER BY q.qid, r.rank DESC
         """
     }
 }
 
 
+def get_db_params():
+    """Get connection parameters from environment variables or use defaults."""
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "database": os.getenv("DB_NAME", "osgeo_wiki"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+        "port": os.getenv("DB_PORT", "5432")
+    }
+
+
 def get_db_connection():
     """Connect to the PostgreSQL database."""
     try:
-        # Get connection parameters from environment variables or use defaults
-        db_params = {
-            "host": os.getenv("DB_HOST", "localhost"),
-            "database": os.getenv("DB_NAME", "osgeo_wiki"),
-            "user": os.getenv("DB_USER", "postgres"),
-            "password": os.getenv("DB_PASSWORD", "postgres"),
-            "port": os.getenv("DB_PORT", "5432")
-        }
-
         # Connect to the database
-        conn = psycopg2.connect(**db_params)
+        conn = psycopg2.connect(**get_db_params())
         conn.autocommit = True
         return conn
     except psycopg2.Error as e:
@@ -136,67 +254,123 @@ def get_db_connection():
         sys.exit(1)
 
 
+def setup_search_session(conn):
+    """Configure a connection for the benchmark and prepare the search statements on it."""
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for setting in SESSION_SETTINGS:
+            cur.execute(f"SET {setting}")
+    prepare_search_statements(conn)
+
+
+def get_db_pool(size, executor):
+    """Open a pool of size connections with the search statements prepared on each."""
+    try:
+        pool = psycopg2.pool.ThreadedConnectionPool(size, size, **get_db_params())
+    except psycopg2.Error as e:
+        print(f"Error connecting to PostgreSQL database: {e}")
+        sys.exit(1)
+
+    # Prepared statements live in the session, so prepare every connection
+    # up front; the pool never opens more than size connections. The
+    # sessions are set up concurrently, each on its own worker
+    conns = [pool.getconn() for _ in range(size)]
+    list(executor.map(setup_search_session, conns))
+    for conn in conns:
+        pool.putconn(conn)
+    return pool
+
+
 def prepare_query_for_tsquery(query):
     """Prepare a natural language query for tsquery format."""
     # Convert to lowercase and remove punctuation
-    query = query.lower().replace('?', '').replace('.', '').replace(',', '')
-
-    # Remove common stopwords that tsquery would ignore anyway
-    stopwords = {'a', 'an', 'the', 'is', 'are', 'was', 'were',
-                 'be', 'to', 'in', 'on', 'at', 'by', 'of', 'for', 'with'}
-    words = [word for word in query.split() if word not in stopwords]
+    query = query.lower().translate(TSQUERY_PUNCTUATION)
 
     # Connect with & for AND operations
-    return ' & '.join(words)
+    return ' & '.join(word for word in query.split() if word not in TSQUERY_STOPWORDS)
+
+
+def prepare_search_statements(conn):
+    """Prepare each search approach once so later executions skip parsing and planning."""
+    with conn.cursor() as cur:
+        for approach, approach_info in SEARCH_APPROACHES.items():
+            # No parameters are passed, so the query's % signs are sent unescaped
+            cur.execute(f"PREPARE search_{approach} ({approach_info['param_types']}) "
+                        f"AS {approach_info['query']}")
+
+
+def get_search_params(approach, query):
+    """Return the statement parameters of one query for the specified approach."""
+    # Handle different parameter requirements for different query types
+    if approach == "basic_tsquery":
+        # The query itself is still needed for the term coverage
+        return (query, prepare_query_for_tsquery(query))
+    if approach == "category_boosted":
+        # Need to extract a key term for category matching
+        key_terms = [w for w in query.lower().split() if len(w) > 3]
+        key_term = key_terms[0] if key_terms else query.split()[0]
+        return (query, key_term)
+    # Standard parameter passing for other query types
+    return (query,)
+
+
+def get_execute_statement(approach, queries):
+    """Return the EXECUTE statement and its parameters for a batch of queries."""
+    # One array per statement parameter, each holding that parameter for every query
+    params = [list(column) for column in
+              zip(*(get_search_params(approach, query) for query in queries))]
+    placeholders = ", ".join(["%s"] * len(params))
+    return f"EXECUTE search_{approach} ({placeholders})", params
+
+
+def explain_search_queries(cur, approach, queries):
+    """Run a batch of search queries under EXPLAIN ANALYZE.
+
+    Returns the server's planning and execution time in ms and the shared
+    buffer blocks found in cache (hit) or read in for the whole batch, and
+    whether the statement succeeded (the measurements are zero if not).
+    """
+    statement, params = get_execute_statement(approach, queries)
 
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", params)
+        plan = cur.fetchone()[0][0]
+        succeeded = True
+    except psycopg2.Error as e:
+        print(f"Error explaining search query '{approach}': {e}")
+        plan = {"Plan": {}}
+        succeeded = False
 
-def count_query_terms_in_result(query, result):
-    """Count how many query terms are present in a result."""
-    query_terms = set(query.lower().replace('?', '').replace('.', '').split())
-    result_text = result["chunk_text"].lower()
+    return {
+        "planning_time_ms": plan.get("Planning Time", 0),
+        "execution_time_ms": plan.get("Execution Time", 0),
+        "shared_hit_blocks": plan["Plan"].get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan["Plan"].get("Shared Read Blocks", 0)
+    }, succeeded
 
-    count = sum(1 for term in query_terms if term in result_text)
-    return count / len(query_terms) if query_terms else 0
 
+def run_search_queries(cur, approach, queries):
+    """Run a batch of search queries using the specified approach.
 
-def run_search_query(conn, approach, query):
-    """Run a search query using the specified approach."""
-    try:
-        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            # Handle different parameter requirements for different query types
-            if approach == "basic_tsquery":
-                tsquery = prepare_query_for_tsquery(query)
-                cur.execute(SEARCH_APPROACHES[approach]
-                            ["query"], (tsquery, tsquery))
-            elif approach == "category_boosted":
-                # Need to extract a key term for category matching
-                key_terms = [w for w in query.lower().split() if len(w) > 3]
-                key_term = key_terms[0] if key_terms else query.split()[0]
-                cur.execute(SEARCH_APPROACHES[approach]
-                            ["query"], (query, key_term, query))
-            elif approach == "fuzzy_trigram":
-                # Fuzzy trigram needs the query parameter twice
-                cur.execute(
-                    SEARCH_APPROACHES[approach]["query"], (query, query))
-            else:
-                # Standard parameter passing for other query types
-                cur.execute(
-                    SEARCH_APPROACHES[approach]["query"], (query, query))
+    Returns the results of each query, keyed by query, and whether the
+    statement succeeded (the results are empty or incomplete if not).
+    """
+    results = {query: [] for query in queries}
+    statement, params = get_execute_statement(approach, queries)
 
-            results = cur.fetchall()
+    try:
+        cur.execute(statement, params)
 
-            # Convert to list of dictionaries
-            results_list = []
-            for row in results:
-                result = dict(row)
-                result["term_coverage"] = count_query_terms_in_result(
-                    query, result)
-                results_list.append(result)
+        # Convert to lists of dictionaries, dispatched back to their query,
+        # straight from the cursor rather than through a fetchall() list
+        for row in cur:
+            result = dict(row)
+            results[queries[result.pop("qid") - 1]].append(result)
 
-            return results_list
+        return results, True
     except psycopg2.Error as e:
-        print(f"Error executing search query '{approach}' for '{query}': {e}")
-        return []
+        print(f"Error executing search query '{approach}': {e}")
+        return results, False
 
 
 def evaluate_search_results(results, query):
@@ -206,8 +380,7 @@ def evaluate_search_results(results, query):
             "found_results": False,
             "result_count": 0,
             "avg_term_coverage": 0,
-            "avg_rank": 0,
-            "execution_time_ms": 0
+            "avg_rank": 0
         }
 
     # Calculate metrics
@@ -222,10 +395,85 @@ def evaluate_search_results(results, query):
     }
 
 
-def run_search_benchmark():
-    """Run a benchmark comparing different search approaches."""
+def refresh_page_categories(conn):
+    """Build each page's categories, blacklist excluded, as an array.
+
+    The arrays live in a materialized view owned by this benchmark, not in
+    the production tables, and are rebuilt from page_categories on each run.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS search_benchmark_page_categories AS
+            SELECT page_id, array_agg(category_name ORDER BY category_name) AS categories
+            FROM page_categories
+            WHERE category_name NOT IN ('Categories', 'Category')
+            GROUP BY page_id
+            WITH NO DATA
+        """)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS search_benchmark_page_categories_page_id "
+                    "ON search_benchmark_page_categories (page_id);")
+        cur.execute("REFRESH MATERIALIZED VIEW search_benchmark_page_categories;")
+
+
+def get_corpus_version(conn):
+    """Return a fingerprint of the indexed content, used to invalidate cached results."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), max(id) FROM page_chunks")
+        chunk_count, max_chunk_id = cur.fetchone()
+        cur.execute("SELECT max(last_crawled) FROM pages")
+        last_crawled = cur.fetchone()[0]
+    return f"{chunk_count}:{max_chunk_id}:{last_crawled}"
+
+
+def open_search_cache():
+    """Open the SQLite cache of search results, creating it if needed."""
+    CACHE_PATH.parent.mkdir(exist_ok=True)
+    cache = sqlite3.connect(CACHE_PATH)
+    cache.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, payload BLOB)")
+    return cache
+
+
+def get_cache_key(approach, queries, corpus_version):
+    """Return the cache key of a batch of queries' results for the specified approach."""
+    # The approach's SQL is part of the key so editing it invalidates its entries
+    sql = SEARCH_APPROACHES[approach]["query"]
+    query_list = "\n".join(queries)
+    return hashlib.sha1(f"{CACHE_FORMAT}|{approach}|{sql}|{query_list}|{corpus_version}".encode()).hexdigest()
+
+
+def run_timed_search(pool, approach, queries):
+    """Run a batch of search queries on a pooled connection.
+
+    Returns the results of each query, the batch's server-side timing
+    and buffer usage (see explain_search_queries), and whether both
+    statements succeeded.
+    """
+    conn = pool.getconn()
+    try:
+        # One cursor serves both statements. The connection is in autocommit
+        # mode, so a failed statement does not leave it in an aborted transaction
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            # Explain first, so the buffer reads are not hidden by the search
+            # itself having just warmed the cache
+            batch_stats, explained = explain_search_queries(cur, approach, queries)
+            batch_results, searched = run_search_queries(cur, approach, queries)
+            return batch_results, batch_stats, explained and searched
+    finally:
+        pool.putconn(conn)
+
+
+def run_search_benchmark(use_cache=True):
+    """Run a benchmark comparing different search approaches.
+
+    Each approach runs all the sample queries as one statement, so timing
+    and buffer usage, measured by PostgreSQL, are for the whole batch.
+    Unless use_cache is False, each approach's results and measurements are
+    cached and reused while the indexed content is unchanged.
+
+    Returns the results of each query, keyed by query then approach, and
+    the batch measurements of each approach.
+    """
     conn = get_db_connection()
-    results = {}
 
     # Enable pg_trgm extension if needed for fuzzy search
     try:
@@ -237,42 +485,137 @@ def run_search_benchmark():
         if "fuzzy_trigram" in SEARCH_APPROACHES:
             del SEARCH_APPROACHES["fuzzy_trigram"]
 
-    for query in SAMPLE_QUERIES:
-        print(f"\nTesting query: '{query}'")
-        query_results = {}
-
-        for approach_name, approach_info in SEARCH_APPROACHES.items():
-            print(f"  Running {approach_name} search...")
-
-            start_time = time.time()
-            search_results = run_search_query(conn, approach_name, query)
-            execution_time = (time.time() - start_time) * 1000  # Convert to ms
-
-            evaluation = evaluate_search_results(search_results, query)
-            evaluation["execution_time_ms"] = execution_time
-
-            query_results[approach_name] = {
-                "results": search_results,
-                "evaluation": evaluation
-            }
-
-            print(
-                f"    Found {len(search_results)} results in {execution_time:.1f}ms")
-            print(f"    Term coverage: {evaluation['avg_term_coverage']:.2f}")
+    # Trigram indexes for the fuzzy search and the category boost's
+    # substring match on category names
+    if "fuzzy_trigram" in SEARCH_APPROACHES:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE INDEX IF NOT EXISTS page_chunks_trgm_idx "
+                            "ON page_chunks USING gin (chunk_text gin_trgm_ops);")
+                cur.execute("CREATE INDEX IF NOT EXISTS page_categories_name_trgm "
+                            "ON page_categories USING gin (category_name gin_trgm_ops);")
+        except psycopg2.Error as e:
+            print(f"Warning: Could not create trigram indexes: {e}")
 
-        results[query] = query_results
+    try:
+        refresh_page_categories(conn)
+    except psycopg2.Error as e:
+        print(f"Warning: Could not build page categories: {e}")
+        # The category boost needs the categories array
+        del SEARCH_APPROACHES["category_boosted"]
 
+    # Covering index so the join can take title and url from an index-only
+    # scan of pages
+    index_created = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('pages_id_cover') IS NULL")
+            index_missing = cur.fetchone()[0]
+            cur.execute("CREATE INDEX IF NOT EXISTS pages_id_cover "
+                        "ON pages (id) INCLUDE (title, url);")
+            index_created = index_missing
+    except psycopg2.Error as e:
+        print(f"Warning: Could not create covering index: {e}")
+
+    # Index-only scans rely on the visibility map, which VACUUM keeps
+    # current. Only needed once the index is new; otherwise autovacuum
+    # keeps up
+    if index_created:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("VACUUM ANALYZE pages, page_chunks;")
+        except psycopg2.Error as e:
+            print(f"Warning: Could not vacuum pages and page_chunks: {e}")
+
+    cache = open_search_cache() if use_cache else None
+    corpus_version = get_corpus_version(conn) if use_cache else None
     conn.close()
-    return results
-
 
-def generate_report(results):
-    """Generate a report comparing the performance of search approaches."""
+    # Look up each approach's batch; only the misses go to the database
+    cached = {}
+    if cache is not None:
+        for approach_name in SEARCH_APPROACHES:
+            row = cache.execute("SELECT payload FROM cache WHERE key = ?",
+                                (get_cache_key(approach_name, SAMPLE_QUERIES, corpus_version),)).fetchone()
+            if row:
+                cached[approach_name] = pickle.loads(row[0])
+
+    pending = [approach_name for approach_name in SEARCH_APPROACHES
+               if approach_name not in cached]
+
+    # The approaches are independent, so run them all at once, each on its
+    # own pooled connection
+    with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as executor:
+        pool = get_db_pool(len(pending), executor) if pending else None
+        futures = {approach_name: executor.submit(run_timed_search, pool,
+                                                  approach_name, SAMPLE_QUERIES)
+                   for approach_name in pending}
+
+        results = {query: {} for query in SAMPLE_QUERIES}
+        batch_stats = {}
+
+        for approach_name in SEARCH_APPROACHES:
+            print(f"\nRunning {approach_name} search for {len(SAMPLE_QUERIES)} queries...")
+
+            if approach_name in futures:
+                batch_results, stats, succeeded = futures[approach_name].result()
+                cached[approach_name] = (batch_results, stats)
+                # A failed batch is reported but not cached, so the next
+                # run retries it instead of replaying its empty results
+                if cache is not None and succeeded:
+                    cache.execute("INSERT OR REPLACE INTO cache (key, payload) VALUES (?, ?)",
+                                  (get_cache_key(approach_name, SAMPLE_QUERIES, corpus_version),
+                                   pickle.dumps(cached[approach_name])))
+            else:
+                print("  Served from cache")
+
+            batch_results, batch_stats[approach_name] = cached[approach_name]
+            for query in SAMPLE_QUERIES:
+                search_results = batch_results[query]
+                evaluation = evaluate_search_results(search_results, query)
+
+                results[query][approach_name] = {
+                    "results": search_results,
+                    "evaluation": evaluation
+                }
+
+                print(f"  '{query}': found {len(search_results)} results, "
+                      f"term coverage {evaluation['avg_term_coverage']:.2f}")
+
+            # The whole batch is one statement, so its timing and buffer
+            # usage are only known for all the queries together
+            stats = batch_stats[approach_name]
+            print(f"  Batch of {len(SAMPLE_QUERIES)} queries: "
+                  f"planning {stats['planning_time_ms']:.1f}ms, "
+                  f"execution {stats['execution_time_ms']:.1f}ms, "
+                  f"shared blocks {stats['shared_hit_blocks']} hit, "
+                  f"{stats['shared_read_blocks']} read")
+
+    if pool is not None:
+        pool.closeall()
+    if cache is not None:
+        cache.commit()
+        cache.close()
+    return results, batch_stats
+
+
+def dump_json(obj):
+    """Serialize obj to indented JSON bytes, converting unsupported values to strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, default=str, indent=2).encode()
+
+
+def generate_report(results, batch_stats):
+    """Generate a report comparing the performance of search approaches.
+
+    The timing and buffer figures are those of each approach's batch of
+    queries (see run_search_benchmark), not of individual queries.
+    """
     # Initialize metrics
     approach_metrics = {approach: {
         "avg_term_coverage": [],
         "avg_result_count": [],
-        "avg_exec_time": [],
         "success_rate": []
     } for approach in SEARCH_APPROACHES.keys()}
 
@@ -284,8 +627,6 @@ def generate_report(results):
                 eval_data["avg_term_coverage"])
             approach_metrics[approach]["avg_result_count"].append(
                 eval_data["result_count"])
-            approach_metrics[approach]["avg_exec_time"].append(
-                eval_data["execution_time_ms"])
             approach_metrics[approach]["success_rate"].append(
                 1 if eval_data["found_results"] else 0)
 
@@ -295,37 +636,50 @@ def generate_report(results):
         summary[approach] = {
             "avg_term_coverage": sum(metrics["avg_term_coverage"]) / len(SAMPLE_QUERIES),
             "avg_result_count": sum(metrics["avg_result_count"]) / len(SAMPLE_QUERIES),
-            "avg_exec_time": sum(metrics["avg_exec_time"]) / len(SAMPLE_QUERIES),
-            "success_rate": sum(metrics["success_rate"]) / len(SAMPLE_QUERIES) * 100
+            "success_rate": sum(metrics["success_rate"]) / len(SAMPLE_QUERIES) * 100,
+            **batch_stats[approach]
         }
 
-    # Create a DataFrame for easier visualization
-    df = pd.DataFrame(summary).T
+    names = list(summary.keys())
+    positions = range(len(names))
 
     # Plot the results
-    fig, axs = plt.subplots(2, 2, figsize=(15, 10))
+    plt = common_utils.get_pyplot()
+    fig, axs = plt.subplots(3, 2, figsize=(15, 15))
 
     # Term coverage
-    axs[0, 0].bar(df.index, df["avg_term_coverage"], color='blue', alpha=0.7)
+    axs[0, 0].bar(names, [summary[a]["avg_term_coverage"] for a in names], color='blue', alpha=0.7)
     axs[0, 0].set_title('Average Term Coverage')
     axs[0, 0].set_ylim(0, 1)
-    axs[0, 0].set_xticklabels(df.index, rotation=45, ha='right')
 
     # Result count
-    axs[0, 1].bar(df.index, df["avg_result_count"], color='green', alpha=0.7)
+    axs[0, 1].bar(names, [summary[a]["avg_result_count"] for a in names], color='green', alpha=0.7)
     axs[0, 1].set_title('Average Result Count')
-    axs[0, 1].set_xticklabels(df.index, rotation=45, ha='right')
 
     # Execution time
-    axs[1, 0].bar(df.index, df["avg_exec_time"], color='red', alpha=0.7)
-    axs[1, 0].set_title('Average Execution Time (ms)')
-    axs[1, 0].set_xticklabels(df.index, rotation=45, ha='right')
+    axs[1, 0].bar(names, [summary[a]["execution_time_ms"] for a in names], color='red', alpha=0.7)
+    axs[1, 0].set_title(f'Batch Execution Time (ms, {len(SAMPLE_QUERIES)} queries)')
 
     # Success rate
-    axs[1, 1].bar(df.index, df["success_rate"], color='purple', alpha=0.7)
+    axs[1, 1].bar(names, [summary[a]["success_rate"] for a in names], color='purple', alpha=0.7)
     axs[1, 1].set_title('Success Rate (%)')
     axs[1, 1].set_ylim(0, 100)
-    axs[1, 1].set_xticklabels(df.index, rotation=45, ha='right')
+
+    # Planning time
+    axs[2, 0].bar(names, [summary[a]["planning_time_ms"] for a in names], color='orange', alpha=0.7)
+    axs[2, 0].set_title(f'Batch Planning Time (ms, {len(SAMPLE_QUERIES)} queries)')
+
+    # Shared buffer usage, split into blocks found in cache and blocks read in
+    hit_blocks = [summary[a]["shared_hit_blocks"] for a in names]
+    axs[2, 1].bar(names, hit_blocks, color='teal', alpha=0.7, label='Hit')
+    axs[2, 1].bar(names, [summary[a]["shared_read_blocks"] for a in names],
+                  bottom=hit_blocks, color='brown', alpha=0.7, label='Read')
+    axs[2, 1].set_title(f'Batch Shared Buffer Blocks ({len(SAMPLE_QUERIES)} queries)')
+    axs[2, 1].legend()
+
+    for ax in axs.flat:
+        ax.set_xticks(positions)
+        ax.set_xticklabels(names, rotation=45, ha='right')
 
     plt.tight_layout()
     plot_path = Path('postgres_search_comparison.png')
@@ -339,14 +693,22 @@ def generate_report(results):
         print(f"  {approach}:")
         print(f"    Term Coverage: {metrics['avg_term_coverage']:.2f}")
         print(f"    Result Count: {metrics['avg_result_count']:.1f}")
-        print(f"    Execution Time: {metrics['avg_exec_time']:.1f}ms")
+        print(f"    Batch Execution Time: {metrics['execution_time_ms']:.1f}ms "
+              f"({metrics['execution_time_ms'] / len(SAMPLE_QUERIES):.1f}ms per query on average)")
+        print(f"    Batch Planning Time: {metrics['planning_time_ms']:.1f}ms")
+        print(f"    Batch Shared Blocks: {metrics['shared_hit_blocks']} hit, "
+              f"{metrics['shared_read_blocks']} read")
         print(f"    Success Rate: {metrics['success_rate']:.1f}%")
 
-    # Save detailed results as JSON for later analysis
-    with open("postgres_search_results.json", "w") as f:
-        # Convert any non-serializable objects to strings
-        serializable_results = json.dumps(results, default=str, indent=2)
-        f.write(serializable_results)
+    # Save detailed results as JSON for later analysis, one query at a time
+    # rather than building the whole document in memory
+    with open("postgres_search_results.json", "wb") as f:
+        f.write(b"{")
+        for i, (query, query_results) in enumerate(results.items()):
+            if i:
+                f.write(b",")
+            f.write(b"\n" + dump_json(query) + b": " + dump_json(query_results))
+        f.write(b"\n}\n")
 
     # Sample result display for the best approach
     best_approach = max(
@@ -371,11 +733,18 @@ def generate_report(results):
 
 def main():
     """Run the PostgreSQL search analysis."""
+    parser = argparse.ArgumentParser(description="Benchmark PostgreSQL search approaches")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignore cached results and time every query against the database"
+    )
+    args = parser.parse_args()
+
     print("=== PostgreSQL Search Analysis ===")
     print("Testing actual database search performance...")
 
-    benchmark_results = run_search_benchmark()
-    generate_report(benchmark_results)
+    benchmark_results, batch_stats = run_search_benchmark(use_cache=not args.no_cache)
+    generate_report(benchmark_results, batch_stats)
 
     print("\nAnalysis complete!")
 
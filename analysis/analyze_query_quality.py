@@ -3,17 +3,20 @@ import os
 import sys
 import random
 import json
+import functools
+import heapq
 from pathlib import Path
-import matplotlib.pyplot as plt
 from collections import Counter, defaultdict
-import re
 
 # Add the current directory to the path so we can import common_utils
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import common_utils
 
 # Define category blacklist
-CATEGORY_BLACKLIST = ['Categories', 'Category']
+CATEGORY_BLACKLIST = frozenset({'Categories', 'Category'})
+
+# Common words that won't help with search
+QUERY_STOPWORDS = frozenset({"is", "the", "a", "an", "in", "on", "at", "and", "or", "to", "with", "about", "tell", "me"})
 
 # Define sample queries that might be asked of the OSGeo wiki bot
 SAMPLE_QUERIES = [
@@ -50,169 +53,141 @@ SAMPLE_QUERIES = [
 
 def preprocess_query(query):
     """Transform a natural language query into search terms."""
-    query = query.lower()
-    
     # Remove common words that won't help with search
-    stopwords = {"is", "the", "a", "an", "in", "on", "at", "and", "or", "to", "with", "about", "tell", "me"}
-    terms = [word for word in query.split() if word not in stopwords]
-    
-    return terms
+    return [word for word in query.lower().split() if word not in QUERY_STOPWORDS]
 
-def chunk_content(content, chunk_size=500):
-    """Split content into chunks of approximately chunk_size characters."""
+def count_term(term_counts, text, term):
+    """Count the occurrences of term in a chunk's text.
+
+    str.count is a C-level substring search; a single-pass multi-pattern
+    (Aho-Corasick) scan has to hand every match back to Python and is
+    several times slower for the few terms of a query. The count is kept
+    in the chunk's term_counts dict from chunk_table, so a term shared by
+    several queries (such as "osgeo") is counted once per chunk while the
+    page's chunks stay cached.
+    """
+    count = term_counts.get(term)
+    if count is None:
+        count = term_counts[term] = text.count(term)
+    return count
+
+def chunk_offsets(content, chunk_size=500):
+    """Group the paragraph offsets of content into chunks of approximately chunk_size characters."""
     chunks = []
-    current_chunk = ""
-    
-    # Split by paragraphs
-    paragraphs = re.split(r'\n\n+', content)
-    
-    for para in paragraphs:
-        if not para.strip():
-            continue
-        
-        if len(current_chunk) + len(para) <= chunk_size:
-            current_chunk += para + "\n\n"
+    current_chunk = []
+    current_length = 0
+    
+    for start, end in common_utils.paragraph_offsets(content):
+        length = end - start
+        if current_length + length <= chunk_size:
+            current_chunk.append((start, end))
+            current_length += length + 2
         else:
             if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = para + "\n\n"
+                chunks.append(tuple(current_chunk))
+            current_chunk = [(start, end)]
+            current_length = length + 2
     
     if current_chunk:
-        chunks.append(current_chunk.strip())
+        chunks.append(tuple(current_chunk))
     
     return chunks
 
-def simulate_text_search(query_terms, wiki_data, chunk_size=500):
-    """Simulate a basic text search on the wiki data."""
-    title = wiki_data.get('title', '')
-    content = wiki_data.get('content', '')
-    url = wiki_data.get('url', '')
-    categories = wiki_data.get('categories', [])
-    
-    # Skip if no content or has blacklisted categories
-    if not content or any(cat in CATEGORY_BLACKLIST for cat in categories):
-        return []
-    
-    # Split content into chunks
-    chunks = chunk_content(content, chunk_size)
-    
-    # Check each chunk for query terms
-    results = []
-    for i, chunk in enumerate(chunks):
-        chunk_lower = chunk.lower()
-        
-        # Count occurrences of each term
-        term_counts = {term: chunk_lower.count(term) for term in query_terms}
-        
-        # Calculate a simple relevance score
-        relevance = sum(term_counts.values())
-        
-        # Only include chunks with at least one term match
-        if relevance > 0:
-            results.append({
-                'title': title,
-                'url': url,
-                'chunk_text': chunk,
-                'rank': relevance,
-                'chunk_index': i
-            })
-    
-    # Sort by relevance
-    results.sort(key=lambda x: x['rank'], reverse=True)
-    
-    return results[:5]  # Return top 5 results
+def join_chunk(content, paragraphs):
+    """Return the text of a chunk from its paragraph offsets."""
+    return "\n\n".join(content[start:end] for start, end in paragraphs).strip()
 
-def simulate_phrase_search(query, wiki_data, chunk_size=500):
-    """Simulate a phrase search on the wiki data."""
-    title = wiki_data.get('title', '')
-    content = wiki_data.get('content', '')
-    url = wiki_data.get('url', '')
-    categories = wiki_data.get('categories', [])
-    
-    # Skip if no content or has blacklisted categories
-    if not content or any(cat in CATEGORY_BLACKLIST for cat in categories):
-        return []
-    
-    # Split content into chunks
-    chunks = chunk_content(content, chunk_size)
-    
-    # Check each chunk for the query phrase
-    results = []
-    for i, chunk in enumerate(chunks):
-        chunk_lower = chunk.lower()
-        query_lower = query.lower()
-        
-        # Count phrase occurrences
-        phrase_count = chunk_lower.count(query_lower)
-        
-        # Calculate relevance
-        relevance = phrase_count * 10  # Weight phrase matches higher
-        
-        # Only include chunks with a phrase match
-        if relevance > 0:
-            results.append({
-                'title': title,
-                'url': url,
-                'chunk_text': chunk,
-                'rank': relevance,
-                'chunk_index': i
-            })
-    
-    # Sort by relevance
-    results.sort(key=lambda x: x['rank'], reverse=True)
-    
-    return results[:5]  # Return top 5 results
+def chunk_content(content, chunk_size=500):
+    """Split content into chunks of approximately chunk_size characters."""
+    return [join_chunk(content, paragraphs)
+            for paragraphs in chunk_offsets(content, chunk_size)]
+
+@functools.lru_cache(maxsize=1024)
+def chunk_table(content, chunk_size=500):
+    """Return the (paragraph offsets, lowercased text, term counts) of the chunks of content.
 
-def simulate_category_boosted_search(query_terms, wiki_data, chunk_size=500):
-    """Simulate a text search with category boosting."""
+    The content is lowercased once and each chunk's lowercased text is
+    sliced from it. The slice runs from the first to the last paragraph,
+    so it keeps the original blank lines between them; this does not
+    change the count of a term or of a single-line phrase. The term counts
+    start empty and are filled by count_term. Cached per content and chunk
+    size: the sample queries search overlapping pages.
+    """
+    # Stays on str rather than UTF-8 bytes: bytes.lower() only folds ASCII,
+    # and CPython already stores ASCII-only text one byte per character
+    content_lower = content.lower()
+    if len(content_lower) != len(content):
+        # A few characters lowercase to several, so the offsets no longer match
+        return tuple((paragraphs, join_chunk(content, paragraphs).lower(), {})
+                     for paragraphs in chunk_offsets(content, chunk_size))
+    return tuple((paragraphs, content_lower[paragraphs[0][0]:paragraphs[-1][1]], {})
+                 for paragraphs in chunk_offsets(content, chunk_size))
+
+def simulate_all_searches(query, query_terms, wiki_data, chunk_size=500):
+    """Simulate the text, phrase and category-boosted searches on the wiki data.
+
+    Each chunk of the page is counted once for all three approaches.
+    Returns the top 5 results of each, in that order.
+    """
     title = wiki_data.get('title', '')
     content = wiki_data.get('content', '')
     url = wiki_data.get('url', '')
     categories = wiki_data.get('categories', [])
     
     # Skip if no content or has blacklisted categories
-    if not content or any(cat in CATEGORY_BLACKLIST for cat in categories):
-        return []
-    
-    # Split content into chunks
-    chunks = chunk_content(content, chunk_size)
+    if not content or CATEGORY_BLACKLIST & wiki_data['categories_set']:
+        return [], [], []
+    
+    query_lower = query.lower()
+    # Each distinct term counts once, however often it appears in the query
+    distinct_terms = tuple(dict.fromkeys(query_terms))
+    chunks = chunk_table(content, chunk_size)
+    
+    # Boost relevance if categories seem relevant; the boost is the same for every chunk
+    categories_lower = [cat.lower() for cat in categories]
+    if any(term in cat_lower for cat_lower in categories_lower for term in query_terms):
+        category_boost = 1.5
+    else:
+        category_boost = 1.0
     
-    # Check each chunk for query terms
-    results = []
-    for i, chunk in enumerate(chunks):
-        chunk_lower = chunk.lower()
-        
+    # Check each chunk for query terms and the query phrase
+    text_hits = []
+    phrase_hits = []
+    category_hits = []
+    for i, (paragraphs, chunk_lower, chunk_counts) in enumerate(chunks):
         # Count occurrences of each term
-        term_counts = {term: chunk_lower.count(term) for term in query_terms}
-        
-        # Calculate base relevance
-        relevance = sum(term_counts.values())
+        term_counts = [count_term(chunk_counts, chunk_lower, term) for term in distinct_terms]
         
-        # Boost relevance if categories seem relevant
-        category_boost = 1.0
-        for cat in categories:
-            cat_lower = cat.lower()
-            for term in query_terms:
-                if term in cat_lower:
-                    category_boost = 1.5
-                    break
+        # Calculate a simple relevance score
+        relevance = sum(term_counts)
         
-        final_relevance = relevance * category_boost
+        # Count phrase occurrences, weighting phrase matches higher. The
+        # terms are words of the lowercased query, so the phrase can only
+        # occur in chunks containing every term
+        if all(term_counts):
+            phrase_relevance = chunk_lower.count(query_lower) * 10
+        else:
+            phrase_relevance = 0
         
-        # Only include chunks with at least one term match
+        # Only include chunks with at least one term or phrase match
         if relevance > 0:
-            results.append({
-                'title': title,
-                'url': url,
-                'chunk_text': chunk,
-                'rank': final_relevance,
-                'chunk_index': i
-            })
-    
-    # Sort by relevance
-    results.sort(key=lambda x: x['rank'], reverse=True)
-    
-    return results[:5]  # Return top 5 results
+            text_hits.append((relevance, i))
+            category_hits.append((relevance * category_boost, i))
+        if phrase_relevance > 0:
+            phrase_hits.append((phrase_relevance, i))
+    
+    def top_results(hits):
+        """Build the result dicts of the top 5 hits, joining only their chunks."""
+        return [{
+            'title': title,
+            'url': url,
+            'chunk_text': join_chunk(content, chunks[i][0]),
+            'rank': rank,
+            'chunk_index': i
+        } for rank, i in heapq.nlargest(5, hits, key=lambda x: x[0])]
+    
+    # Return the top 5 results of each approach by relevance
+    return top_results(text_hits), top_results(phrase_hits), top_results(category_hits)
 
 def evaluate_result(results, query_terms):
     """Evaluate search result relevance based on simple metrics."""
@@ -224,10 +199,12 @@ def evaluate_result(results, query_terms):
             "avg_term_frequency": 0
         }
     
-    # Basic metrics
+    # Basic metrics, lowercasing each result once rather than once per term
+    result_texts = [result["chunk_text"].lower() for result in results]
     term_frequencies = []
     for term in query_terms:
-        term_freq = sum(result["chunk_text"].lower().count(term.lower()) for result in results)
+        term_lower = term.lower()
+        term_freq = sum(text.count(term_lower) for text in result_texts)
         term_frequencies.append(term_freq)
     
     avg_term_freq = sum(term_frequencies) / len(term_frequencies) if term_frequencies else 0
@@ -240,79 +217,38 @@ def evaluate_result(results, query_terms):
         "avg_term_frequency": avg_term_freq
     }
 
-def find_pages_with_term(query, min_pages=10):
-    """Find pages that contain the query terms instead of random sampling."""
-    query_terms = query.lower().split()
-    files = common_utils.list_wiki_files()
-    matching_files = []
-    
-    # Find pages that contain all query terms
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        content = wiki_data.get('content', '').lower()
-        
-        if all(term in content for term in query_terms):
-            matching_files.append(file_path)
-            if len(matching_files) >= min_pages:
-                break
-    
-    # If we didn't find enough pages with all terms, try pages with any term
-    if len(matching_files) < min_pages:
-        for file_path in files:
-            if file_path in matching_files:
-                continue
-                
-            wiki_data = common_utils.parse_wiki_file(file_path)
-            content = wiki_data.get('content', '').lower()
-            
-            if any(term in content for term in query_terms):
-                matching_files.append(file_path)
-                if len(matching_files) >= min_pages:
-                    break
-    
-    return matching_files[:min_pages]
-
 def simulate_search_approaches(query, wiki_files, chunk_size=500):
     """Simulate different search approaches for a query."""
     query_terms = preprocess_query(query)
     
-    # Initialize results for each approach
-    approach_results = {
-        "basic_text_search": [],
-        "phrase_search": [],
-        "category_boosted_search": []
+    # Best result per URL + chunk_index for each approach, with the order it was found in
+    approach_best = {
+        "basic_text_search": {},
+        "phrase_search": {},
+        "category_boosted_search": {}
     }
     
     # Process all wiki files
+    found = 0
     for file_path in wiki_files:
         wiki_data = common_utils.parse_wiki_file(file_path)
         
         # Run each search approach
-        text_results = simulate_text_search(query_terms, wiki_data, chunk_size)
-        phrase_results = simulate_phrase_search(query, wiki_data, chunk_size)
-        category_results = simulate_category_boosted_search(query_terms, wiki_data, chunk_size)
-        
-        # Append results
-        approach_results["basic_text_search"].extend(text_results)
-        approach_results["phrase_search"].extend(phrase_results)
-        approach_results["category_boosted_search"].extend(category_results)
-    
-    # Sort and deduplicate results for each approach
-    for approach in approach_results:
-        # Sort by rank
-        approach_results[approach].sort(key=lambda x: x['rank'], reverse=True)
-        
-        # Deduplicate by URL + chunk_index
-        seen = set()
-        unique_results = []
-        for result in approach_results[approach]:
-            key = (result['url'], result['chunk_index'])
-            if key not in seen:
-                seen.add(key)
-                unique_results.append(result)
+        file_results = simulate_all_searches(query, query_terms, wiki_data, chunk_size)
         
-        # Keep top 5
-        approach_results[approach] = unique_results[:5]
+        # Deduplicate by URL + chunk_index, keeping the first highest ranked result
+        for best, results in zip(approach_best.values(), file_results):
+            for result in results:
+                key = (result['url'], result['chunk_index'])
+                if key not in best or result['rank'] > best[key][1]['rank']:
+                    best[key] = (found, result)
+                found += 1
+    
+    # Keep the top 5 of each approach, earlier results first among equal ranks
+    approach_results = {}
+    for approach, best in approach_best.items():
+        top = heapq.nlargest(5, best.values(), key=lambda x: (x[1]['rank'], -x[0]))
+        approach_results[approach] = [result for _, result in top]
     
     return approach_results
 
@@ -326,7 +262,7 @@ def run_search_simulation():
         print(f"Processed as search terms: {query_terms}")
         
         # Find relevant wiki files to search
-        wiki_files = find_pages_with_term(query, min_pages=10)
+        wiki_files = common_utils.find_pages_with_term(query, min_pages=10)
         print(f"Found {len(wiki_files)} relevant pages to search")
         
         # Simulate different search approaches
@@ -370,6 +306,7 @@ def generate_report(results):
                 for approach, scores in approach_scores.items()}
     
     # Plot comparison
+    plt = common_utils.get_pyplot()
     plt.figure(figsize=(10, 6))
     approaches = list(avg_scores.keys())
     scores = list(avg_scores.values())
@@ -385,7 +322,7 @@ def generate_report(results):
     plot_path = Path('search_approach_comparison.png')
     plt.savefig(plot_path)
     print(f"\nPlot saved to {plot_path.absolute()}")
-    plt.close()
+    plt.close('all')
     
     # Print summary
     print("\nApproach Performance Summary:")
@@ -2,8 +2,24 @@
 import os
 import json
 import re
+import functools
+import hashlib
+import heapq
+import pickle
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Blank-line paragraph separator used by all chunking code
+PARAGRAPH_RE = re.compile(r'\n\n+')
+
+# The inverted index is cached here between runs. Bump INDEX_CACHE_FORMAT
+# when the cached index changes shape
+INDEX_CACHE_PATH = Path(__file__).parent / '.cache' / 'inverted_index.pickle'
+INDEX_CACHE_FORMAT = 1
+
+# Separator between the header and the content of a wiki dump file, as written by the crawler
+_CONTENT_MARKER = '\nContent:\n'
 
 def get_wiki_dump_path():
     """Return the path to the wiki dump directory."""
@@ -17,43 +33,176 @@ def get_url_map():
             return json.load(f)
     return {}
 
+@functools.lru_cache(maxsize=1)
 def list_wiki_files():
-    """Return a list of all wiki files in the dump."""
+    """Return a tuple of all wiki files in the dump.
+
+    The directory is scanned once per process; later calls return the cached tuple.
+    """
     wiki_dump_path = get_wiki_dump_path()
+    if not wiki_dump_path.is_dir():
+        return ()
     # Exclude url_map.json
-    return [f for f in wiki_dump_path.glob('*') 
-            if f.is_file() and f.name != 'url_map.json']
+    with os.scandir(wiki_dump_path) as entries:
+        return tuple(wiki_dump_path / entry.name for entry in entries
+                     if entry.is_file() and entry.name != 'url_map.json')
+
+def map_wiki_files(worker, files=None, chunksize=32):
+    """Apply worker to every wiki file in a process pool, yielding results in file order.
+
+    The worker must be a module-level function (or functools.partial of one)
+    so it can be pickled to the pool processes.
+    """
+    if files is None:
+        files = list_wiki_files()
+    with ProcessPoolExecutor() as executor:
+        yield from executor.map(worker, files, chunksize=chunksize)
 
 def parse_wiki_file(file_path):
-    """Parse a wiki file and return its structured content."""
+    """Parse a wiki file and return its structured content.
+
+    The most recently used files are cached, so serial analyses that visit
+    the same file more than once in a run only read and parse it the first
+    time. The returned dict is shared between callers and must not be
+    modified. Workers run by map_wiki_files visit each file once and should
+    call read_wiki_file instead.
+    """
+    return _parse_wiki_file(str(file_path))
+
+@functools.lru_cache(maxsize=1024)
+def _parse_wiki_file(file_path):
+    """Cached read_wiki_file, for parse_wiki_file."""
+    return read_wiki_file(file_path)
+
+def read_wiki_file(file_path):
+    """Read and parse a wiki file without caching it."""
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        text = f.read()
     
-    # Extract basic metadata
-    url_match = re.search(r'URL: (.*?)\n', content)
-    title_match = re.search(r'Title: (.*?)\n', content)
+    # Split the header from the main content
+    content_start = text.find(_CONTENT_MARKER)
+    if content_start == -1:
+        header, main_content = text, ""
+    else:
+        header = text[:content_start]
+        main_content = text[content_start + len(_CONTENT_MARKER):]
     
-    # Extract categories
+    # Extract metadata and categories from the header lines
+    url = title = None
     categories = []
-    categories_section = re.search(r'Categories:\n(.*?)\n\nContent:', 
-                                  content, re.DOTALL)
-    if categories_section:
-        categories_text = categories_section.group(1)
-        categories = [cat.strip('- \n') for cat in categories_text.split('\n')
-                     if cat.strip('- \n')]
-    
-    # Extract main content
-    content_match = re.search(r'Content:\n(.*)', content, re.DOTALL)
-    main_content = content_match.group(1) if content_match else ""
+    in_categories = False
+    for line in header.split('\n'):
+        if in_categories:
+            if not line:
+                in_categories = False
+            elif line.strip('- '):
+                categories.append(line.strip('- '))
+        elif url is None and line.startswith('URL: '):
+            url = line[len('URL: '):]
+        elif title is None and line.startswith('Title: '):
+            title = line[len('Title: '):]
+        elif line == 'Categories:':
+            in_categories = True
     
     return {
-        'url': url_match.group(1) if url_match else None,
-        'title': title_match.group(1) if title_match else None,
+        'url': url,
+        'title': title,
         'categories': categories,
+        'categories_set': frozenset(categories),
         'content': main_content,
-        'file_path': file_path
+        'file_path': Path(file_path)
     }
 
+def _content_words(file_path):
+    """Return the distinct lowercased words of a wiki file's content."""
+    return set(read_wiki_file(file_path).get('content', '').lower().split())
+
+def get_dump_version(files=None):
+    """Return a fingerprint of the wiki files, used to invalidate cached artifacts.
+
+    Covers the dump location and each file's name, size and modification
+    time, in list order.
+    """
+    if files is None:
+        files = list_wiki_files()
+    digest = hashlib.sha1(str(get_wiki_dump_path().resolve()).encode())
+    for file_path in files:
+        stat = file_path.stat()
+        digest.update(f"\n{file_path.name}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return f"{INDEX_CACHE_FORMAT}:{len(files)}:{digest.hexdigest()}"
+
+@functools.lru_cache(maxsize=1)
+def build_inverted_index():
+    """Index the wiki content by word, reading every file once per process.
+
+    The index is saved to INDEX_CACHE_PATH and reused by later runs for as
+    long as the dump is unchanged. Otherwise the files are read and split
+    in parallel. Returns a dict mapping each lowercased, whitespace-delimited
+    word to the ascending ids (positions in list_wiki_files()) of the files
+    containing it.
+    """
+    dump_version = get_dump_version()
+    try:
+        with open(INDEX_CACHE_PATH, 'rb') as f:
+            if pickle.load(f) == dump_version:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    
+    index = defaultdict(list)
+    for file_id, words in enumerate(map_wiki_files(_content_words)):
+        for word in words:
+            index[word].append(file_id)
+    index = dict(index)
+    
+    # Write to a temporary file first so an interrupted run leaves no partial cache
+    INDEX_CACHE_PATH.parent.mkdir(exist_ok=True)
+    temp_path = INDEX_CACHE_PATH.with_suffix('.tmp')
+    with open(temp_path, 'wb') as f:
+        pickle.dump(dump_version, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, INDEX_CACHE_PATH)
+    return index
+
+@functools.lru_cache(maxsize=1)
+def _get_index_vocabulary():
+    """Return the indexed words as one newline-separated string, for pattern scans."""
+    return '\n'.join(build_inverted_index())
+
+@functools.lru_cache(maxsize=None)
+def _find_file_ids_with_term(term):
+    """Return the ids of the files whose lowercased content contains term."""
+    # A term without whitespace can only occur inside a single word, so the
+    # files containing it are those of the indexed words containing it
+    index = build_inverted_index()
+    pattern = re.compile(r'^.*' + re.escape(term) + r'.*$', re.MULTILINE)
+    file_ids = set()
+    for word in pattern.findall(_get_index_vocabulary()):
+        file_ids.update(index[word])
+    return frozenset(file_ids)
+
+def find_pages_with_term(query, min_pages=10):
+    """Find up to min_pages files containing the query terms, in file order.
+
+    Files containing all the terms come first; if there are fewer than
+    min_pages of them, files containing any of the terms fill the rest.
+    """
+    query_terms = query.lower().split()
+    files = list_wiki_files()
+    term_file_ids = [_find_file_ids_with_term(term) for term in query_terms]
+    
+    # Find pages that contain all query terms
+    all_ids = frozenset.intersection(*term_file_ids) if term_file_ids else range(len(files))
+    matching_ids = heapq.nsmallest(min_pages, all_ids)
+    
+    # If we didn't find enough pages with all terms, fill up from the
+    # postings already looked up for pages with any term
+    if len(matching_ids) < min_pages:
+        any_ids = frozenset().union(*term_file_ids).difference(matching_ids)
+        matching_ids.extend(heapq.nsmallest(min_pages - len(matching_ids), any_ids))
+    
+    return [files[file_id] for file_id in matching_ids]
+
 def extract_sections(content):
     """Extract sections from wiki content."""
     # Simple section detection based on common patterns
@@ -68,6 +217,38 @@ def extract_sections(content):
         return result
     return [('Main', content)]  # No sections found
 
+def get_pyplot():
+    """Import and return matplotlib.pyplot on first use, with the non-interactive Agg backend.
+
+    The analysis scripts only save plots to files, so importing pyplot is
+    deferred until a plot is drawn and GUI backend probing is skipped.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+@functools.lru_cache(maxsize=1024)
+def paragraph_offsets(content):
+    """Return the (start, end) offsets of the non-blank paragraphs of content.
+
+    Cached per content, so a page chunked by several approaches or at
+    several chunk sizes is only split once.
+    """
+    offsets = []
+    start = 0
+    for match in PARAGRAPH_RE.finditer(content):
+        if match.start() > start and not content[start:match.start()].isspace():
+            offsets.append((start, match.start()))
+        start = match.end()
+    if len(content) > start and not content[start:].isspace():
+        offsets.append((start, len(content)))
+    return tuple(offsets)
+
+def split_paragraphs(content):
+    """Split content on blank lines and return the non-blank paragraphs."""
+    return [para for para in PARAGRAPH_RE.split(content) if para.strip()]
+
 def extract_potential_chunks(content, min_size=100, max_size=1000):
     """Extract potential chunks from content based on size constraints."""
     # First try to split by sections
@@ -77,19 +258,22 @@ def extract_potential_chunks(content, min_size=100, max_size=1000):
     for section_title, section_content in sections:
         # If section is too large, split by paragraphs
         if len(section_content) > max_size:
-            paragraphs = re.split(r'\n\n+', section_content)
-            current_chunk = ""
+            paragraphs = PARAGRAPH_RE.split(section_content)
+            current_chunk = []
+            current_length = 0
             
             for para in paragraphs:
-                if len(current_chunk) + len(para) <= max_size:
-                    current_chunk += para + "\n\n"
+                if current_length + len(para) <= max_size:
+                    current_chunk.append(para)
+                    current_length += len(para) + 2
                 else:
                     if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = para + "\n\n"
+                        chunks.append("\n\n".join(current_chunk).strip())
+                    current_chunk = [para]
+                    current_length = len(para) + 2
             
             if current_chunk:
-                chunks.append(current_chunk.strip())
+                chunks.append("\n\n".join(current_chunk).strip())
         else:
             chunks.append(section_content.strip())
     
@@ -31,109 +31,89 @@ SAMPLE_QUERIES = [
 def chunk_content(content, chunk_size):
     """Split content into chunks of approximately chunk_size characters, enforcing max size."""
     chunks = []
-    paragraphs = re.split(r'\n\n+', content)
     
-    current_chunk = ""
-    for para in paragraphs:
-        para_clean = para.strip()
-        if not para_clean:
-            continue
+    # Chunks are collected as lists of pieces and joined once, each piece
+    # keeping the separator that follows it
+    current_chunk = []
+    current_length = 0
+    # Paragraph offsets are cached per content, so the chunk sizes share one split
+    for start, end in common_utils.paragraph_offsets(content):
+        para_clean = content[start:end].strip()
             
         # If this paragraph would make the chunk too big, start a new chunk
-        if len(current_chunk) + len(para_clean) > chunk_size:
+        if current_length + len(para_clean) > chunk_size:
             # If the current paragraph is itself larger than chunk_size, split it
             if len(para_clean) > chunk_size:
                 # First add the current chunk if it's not empty
                 if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
+                    chunks.append("".join(current_chunk).strip())
+                    current_chunk = []
+                    current_length = 0
                 
                 # Split the paragraph into sentences
                 sentences = re.split(r'(?<=[.!?])\s+', para_clean)
-                current_sentence_chunk = ""
+                current_sentence_chunk = []
+                current_sentence_length = 0
                 
                 for sentence in sentences:
-                    if len(current_sentence_chunk) + len(sentence) <= chunk_size:
-                        current_sentence_chunk += sentence + " "
+                    if current_sentence_length + len(sentence) <= chunk_size:
+                        current_sentence_chunk.append(sentence + " ")
+                        current_sentence_length += len(sentence) + 1
                     else:
                         if current_sentence_chunk:
-                            chunks.append(current_sentence_chunk.strip())
+                            chunks.append("".join(current_sentence_chunk).strip())
                         
                         # If the sentence itself is too long, split it by force
                         if len(sentence) > chunk_size:
                             # Split it into word groups that fit
                             words = sentence.split()
-                            current_word_chunk = ""
+                            current_word_chunk = []
+                            current_word_length = 0
                             
                             for word in words:
-                                if len(current_word_chunk) + len(word) + 1 <= chunk_size:
-                                    current_word_chunk += word + " "
+                                if current_word_length + len(word) + 1 <= chunk_size:
+                                    current_word_chunk.append(word + " ")
+                                    current_word_length += len(word) + 1
                                 else:
                                     if current_word_chunk:
-                                        chunks.append(current_word_chunk.strip())
-                                    current_word_chunk = word + " "
+                                        chunks.append("".join(current_word_chunk).strip())
+                                    current_word_chunk = [word + " "]
+                                    current_word_length = len(word) + 1
                             
-                            if current_word_chunk:
-                                current_sentence_chunk = current_word_chunk
-                            else:
-                                current_sentence_chunk = ""
+                            current_sentence_chunk = current_word_chunk
+                            current_sentence_length = current_word_length
                         else:
-                            current_sentence_chunk = sentence + " "
+                            current_sentence_chunk = [sentence + " "]
+                            current_sentence_length = len(sentence) + 1
                 
                 if current_sentence_chunk:
                     current_chunk = current_sentence_chunk
+                    current_length = current_sentence_length
             else:
                 # Just add the current chunk and start a new one with this paragraph
                 if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para_clean + "\n\n"
+                    chunks.append("".join(current_chunk).strip())
+                current_chunk = [para_clean + "\n\n"]
+                current_length = len(para_clean) + 2
         else:
-            current_chunk += para_clean + "\n\n"
+            current_chunk.append(para_clean + "\n\n")
+            current_length += len(para_clean) + 2
     
     # Add the last chunk if it's not empty
     if current_chunk:
-        chunks.append(current_chunk.strip())
+        chunks.append("".join(current_chunk).strip())
     
     return chunks
 
-def find_pages_with_term(query, min_pages=10):
-    """Find pages that contain the query terms."""
-    query_terms = query.lower().split()
-    files = common_utils.list_wiki_files()
-    matching_files = []
-    
-    # Find pages that contain all query terms
-    for file_path in files:
-        wiki_data = common_utils.parse_wiki_file(file_path)
-        content = wiki_data.get('content', '').lower()
-        
-        if all(term in content for term in query_terms):
-            matching_files.append(file_path)
-            if len(matching_files) >= min_pages:
-                break
-    
-    # If we didn't find enough pages with all terms, try pages with any term
-    if len(matching_files) < min_pages:
-        for file_path in files:
-            if file_path in matching_files:
-                continue
-                
-            wiki_data = common_utils.parse_wiki_file(file_path)
-            content = wiki_data.get('content', '').lower()
-            
-            if any(term in content for term in query_terms):
-                matching_files.append(file_path)
-                if len(matching_files) >= min_pages:
-                    break
-    
-    return matching_files[:min_pages]
+def compile_term_patterns(query_terms):
+    """Compile the case-insensitive whole-word patterns used to highlight query terms."""
+    return [re.compile(r'(\b' + re.escape(term) + r'\b)', re.IGNORECASE)
+            for term in query_terms]
 
-def highlight_matches(text, query_terms):
-    """Highlight query terms in the text."""
+def highlight_matches(text, term_patterns):
+    """Highlight query terms in the text, given their compiled patterns."""
     result = text
-    for term in query_terms:
-        # Create a regex pattern to match the term case-insensitively
-        pattern = re.compile(r'(\b' + re.escape(term) + r'\b)', re.IGNORECASE)
+    for pattern in term_patterns:
         # Replace matches with highlighted version
         result = pattern.sub(f'{Fore.RED}{Back.YELLOW}\\1{Style.RESET_ALL}', result)
     
@@ -181,7 +161,8 @@ def get_context(text, term, context_chars=50):
 def simulate_search(query, chunk_sizes=[500, 2000, 10000], num_pages=10, max_results=3):
     """Simulate searching for a query using different chunk sizes."""
     query_terms = query.lower().split()
-    search_pages = find_pages_with_term(query, min_pages=num_pages)
+    term_patterns = compile_term_patterns(query_terms)
+    search_pages = common_utils.find_pages_with_term(query, min_pages=num_pages)
     
     print(f"\n{Fore.GREEN}===== SEARCH QUERY: '{query}' ====={Style.RESET_ALL}")
     print(f"Found {len(search_pages)} pages containing search terms.")
@@ -235,14 +216,14 @@ def simulate_search(query, chunk_sizes=[500, 2000, 10000], num_pages=10, max_res
                 for term in query_terms:
                     context = get_context(chunk, term, context_chars=70)
                     if context:
-                        contexts.append(highlight_matches(context, query_terms))
+                        contexts.append(highlight_matches(context, term_patterns))
                 
                 if contexts:
                     for i, ctx in enumerate(contexts[:2]):  # Show at most 2 contexts
                         print(f"{Fore.YELLOW}Context {i+1}:{Style.RESET_ALL} {ctx}")
                 else:
                     # Fallback to general preview
-                    preview = truncate_text(highlight_matches(chunk, query_terms), 300)
+                    preview = truncate_text(highlight_matches(chunk, term_patterns), 300)
                     print(preview)
                 
                 # Show chunk size
@@ -1,153 +1,373 @@
 import requests
-from bs4 import BeautifulSoup
-import re
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import os
 import time
 import json
 import base64
-from urllib.parse import urljoin, unquote
+import functools
+import hashlib
+import threading
+import atexit
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, unquote, quote
+
+# orjson is optional; without it JSON is read and written with the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# lxml is optional; without it pages are parsed by BeautifulSoup with the
+# slower pure-Python parser
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    # The page elements read by the crawler, as XPath expressions compiled once
+    TITLE_XPATH = etree.XPath('//h1[@id="firstHeading"]')
+    CONTENT_XPATH = etree.XPath('//div[@id="mw-content-text"]')
+    CATEGORY_LINKS_XPATH = etree.XPath('(//div[@id="catlinks"])[1]//a')
+except ImportError:
+    lxml_html = None
+
+# The only parts of an article page the crawler reads; everything else is
+# skipped while parsing
+PAGE_ELEMENT_IDS = ('firstHeading', 'mw-content-text', 'catlinks')
+PAGE_STRAINER = SoupStrainer(['h1', 'div'], attrs={'id': list(PAGE_ELEMENT_IDS)})
+
+# Tags whose text BeautifulSoup's get_text() leaves out, and tags inside
+# which it keeps whitespace-only strings as they are
+HIDDEN_TEXT_TAGS = frozenset({'script', 'style', 'template', 'rt', 'rp'})
+PRESERVE_WHITESPACE_TAGS = frozenset({'pre', 'textarea'})
+ASCII_SPACES = ' \n\t\x0c\r'
+
+
+def json_loads(data):
+    """Parse a JSON document, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def element_strings(element):
+    """Yield the strings of an lxml element as BeautifulSoup's get_text() would see them"""
+    # Only ancestors inside the part kept by PAGE_STRAINER count, as
+    # BeautifulSoup never builds the elements outside it
+    ancestors = list(element.iterancestors())
+    kept = max((i + 1 for i, ancestor in enumerate(ancestors)
+                if ancestor.tag in ('h1', 'div') and ancestor.get('id') in PAGE_ELEMENT_IDS),
+               default=0)
+    ancestor_tags = {ancestor.tag for ancestor in ancestors[:kept]}
+    hidden = 1 if ancestor_tags & HIDDEN_TEXT_TAGS else 0
+    preserve = 1 if ancestor_tags & PRESERVE_WHITESPACE_TAGS else 0
+
+    def clean(text):
+        # BeautifulSoup collapses whitespace-only strings outside <pre> and <textarea>
+        if preserve or text.strip(ASCII_SPACES):
+            return text
+        return '\n' if '\n' in text else ' '
+
+    for event, node in etree.iterwalk(element, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            if node.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve += 1
+            if hidden or node.tag in HIDDEN_TEXT_TAGS:
+                hidden += 1
+            elif node.text:
+                yield clean(node.text)
+            continue
+
+        # Comments and processing instructions have no visible text, only a tail
+        if event == 'end':
+            if node.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve -= 1
+            if hidden:
+                hidden -= 1
+        if not hidden and node is not element and node.tail:
+            yield clean(node.tail)
 
 
 class SimpleOSGeoWikiCrawler:
-    def __init__(self, base_url="https://wiki.osgeo.org", output_dir="../wiki_dump"):
+    def __init__(self, base_url="https://wiki.osgeo.org", output_dir="../wiki_dump",
+                 concurrency=8, request_interval=0.25, queue_size=32):
         self.base_url = base_url
+        self.concurrency = concurrency  # Pages fetched at the same time
+        self.request_interval = request_interval  # Minimum seconds between requests to the wiki
+        self.queue_size = max(queue_size, 1)  # Downloaded pages waiting to be parsed, at most
+        self._rate_lock = threading.Lock()
+        self._next_request_time = 0.0
         self.session = requests.Session()
+        # Accept-Encoding is left to requests: it already asks for gzip and
+        # deflate, plus br and zstd when their decoders are installed, and
+        # decompresses responses transparently. Naming encodings here would
+        # either drop those or ask for ones that cannot be decoded
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/91.0'
         })
+        # Keep one keep-alive connection per fetch thread to the wiki host
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.output_dir = output_dir
-        self.visited = set()
+        self.visited = set()  # url_key() of every URL handled this run
         self.url_map = {}  # Mapping between filenames and URLs
         self.url_map_file = os.path.join(output_dir, "url_map.json")
+        # URL map entries added since the last snapshot, one JSON pair per
+        # line. The log and the map's temporary file are kept next to the
+        # output directory, not in it, as everything else there is read as
+        # a wiki page
+        state_prefix = os.path.normpath(output_dir)
+        self.url_map_log_file = state_prefix + ".url_map.jsonl"
+        self.url_map_temp_file = state_prefix + ".url_map.json.tmp"
 
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
 
-        # Load existing URL map if it exists
+        # Load existing URL map if it exists. If it cannot be read, it is
+        # never saved over, so a crawl cannot replace it with a partial map
+        self._url_map_loaded = True
         if os.path.exists(self.url_map_file):
             try:
-                with open(self.url_map_file, 'r', encoding='utf-8') as f:
-                    self.url_map = json.load(f)
+                with open(self.url_map_file, 'rb') as f:
+                    self.url_map = json_loads(f.read())
                 print(f"Loaded {len(self.url_map)} URLs from existing map")
             except Exception as e:
                 print(f"Error loading URL map: {e}")
+                self._url_map_loaded = False
 
-    def get_all_pages(self):
-        """Get all wiki page links from the Special:AllPages page"""
-        all_pages = []
-        url = f"{self.base_url}/wiki/Special:AllPages"
+        # Replay entries logged by a crawl that stopped before its final snapshot
+        if os.path.exists(self.url_map_log_file):
+            try:
+                with open(self.url_map_log_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            key, value = json.loads(line)
+                            self.url_map[key] = value
+                print(f"Replayed URL map log, now {len(self.url_map)} URLs")
+            except Exception as e:
+                print(f"Error replaying URL map log: {e}")
+                self._url_map_loaded = False
 
-        while url:
-            print(f"Fetching page list from: {url}")
-            response = self.session.get(url)
+        # New entries are appended to the log; the full map is only written
+        # at the end of a run, or at exit if the run is interrupted
+        self._url_map_log = None
+
+        # Reverse URL map (first filename stored for each URL) and the files
+        # already in the output directory, for constant-time download checks
+        self.url_files = {}
+        for filename, url in self.url_map.items():
+            self.url_files.setdefault(url, filename)
+        self.existing_files = set(os.listdir(output_dir))
+
+    def get_all_pages(self):
+        """Get all wiki page links from the MediaWiki allpages API"""
+        all_pages = {}  # Page URLs in listing order; a dict drops repeats as they come
+        api_url = f"{self.base_url}/w/api.php"
+        params = {
+            'action': 'query',
+            'list': 'allpages',
+            'aplimit': 'max',
+            'apnamespace': 0,  # Main namespace only, like Special:AllPages
+            'format': 'json'
+        }
+
+        while True:
+            print(f"Fetching page list from: {api_url} (from: {params.get('apcontinue', 'start')})")
+            self._wait_for_turn()
+            response = self.session.get(api_url, params=params)
             if response.status_code != 200:
                 print(
-                    f"Failed to fetch {url}, status code: {response.status_code}")
+                    f"Failed to fetch {api_url}, status code: {response.status_code}")
                 break
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Extract links to actual wiki pages
-            content_div = soup.find('div', {'class': 'mw-allpages-body'})
-            if content_div:
-                for link in content_div.find_all('a'):
-                    page_url = urljoin(self.base_url, link.get('href'))
-                    if '/wiki/' in page_url and not any(x in page_url for x in ['Special:', 'File:', 'Category:', 'Template:']):
-                        all_pages.append(page_url)
+            try:
+                data = json_loads(response.content)
+            except ValueError as e:
+                # orjson's JSONDecodeError is a ValueError too
+                print(f"Invalid JSON from {api_url}: {e}")
+                break
 
-            # Find the "next page" link
-            next_link = soup.find('a', string=re.compile(r'Next page|Next'))
-            url = urljoin(self.base_url, next_link.get(
-                'href')) if next_link else None
+            for page in data.get('query', {}).get('allpages', []):
+                all_pages[self.title_to_url(page['title'])] = None
 
-            # Be polite
-            time.sleep(1)
+            # Follow the continuation token to the next batch of titles
+            if 'continue' not in data:
+                break
+            params['apcontinue'] = data['continue']['apcontinue']
 
         print(f"Found {len(all_pages)} wiki pages")
-        return all_pages
-
-    def url_to_filename(self, url):
+        return list(all_pages)
+
+    def title_to_url(self, title):
+        """Build a page URL the way MediaWiki links it, so filenames match earlier crawls"""
+        # MediaWiki leaves these characters unescaped in article paths
+        path = quote(title.replace(' ', '_'), safe=";@$!*(),/~:")
+        return urljoin(self.base_url, f"/wiki/{path}")
+
+    def url_key(self, url):
+        """Return a compact 64-bit digest of a URL for the visited set"""
+        # Much smaller than the URL string, and with 64 bits a collision is
+        # negligible at any wiki's page count, unlike a Bloom filter's false positives
+        return hashlib.blake2b(url.encode(), digest_size=8).digest()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=200_000)
+    def url_to_filename(url):
         """Convert URL to a suitable filename using base64 encoding"""
+        # Cached, as every URL is converted when checking for an earlier
+        # download and again when the page is saved
+
         # Extract the page name from the URL
         page_name = url.split('/wiki/')[-1]
 
         # Use base64 encoding to ensure uniqueness and avoid special chars
         # We'll strip padding characters (=) which aren't needed for filenames
         encoded = base64.urlsafe_b64encode(
-            page_name.encode()).decode().rstrip('=')
+            page_name.encode()).rstrip(b'=').decode('ascii')
 
         return encoded
 
     def is_already_downloaded(self, url):
         """Check if a page is already downloaded"""
-        # Check if URL exists in our map
-        for filename, stored_url in self.url_map.items():
-            if stored_url == url:
-                return os.path.exists(os.path.join(self.output_dir, filename))
-
-        # If URL not in map, check by generating the filename
-        filename = self.url_to_filename(url)
-        return os.path.exists(os.path.join(self.output_dir, filename))
+        # Check if URL exists in our map; if not, check by generating the filename
+        filename = self.url_files.get(url) or self.url_to_filename(url)
+        return filename in self.existing_files
 
     def extract_page(self, url):
         """Extract a wiki page"""
-        if url in self.visited:
+        key = self.url_key(url)
+        if key in self.visited:
             return None
 
-        self.visited.add(url)
+        self.visited.add(key)
 
         # Skip if already downloaded
         if self.is_already_downloaded(url):
             print(f"Skipping already downloaded: {url}")
             return None
 
+        return self.fetch_page(url)
+
+    def fetch_page(self, url):
+        """Fetch and parse a wiki page"""
+        response = self.download_page(url)
+        if response is None:
+            return None
+        return self.parse_page(url, response)
+
+    def download_page(self, url):
+        """Download a wiki page and return the response; safe to call from several threads"""
         print(f"Fetching content from: {url}")
 
         try:
+            self._wait_for_turn()
             response = self.session.get(url)
             if response.status_code != 200:
                 print(
                     f"Failed to fetch {url}, status code: {response.status_code}")
                 return None
+            return response
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Extract title
-            title_element = soup.find('h1', {'id': 'firstHeading'})
-            title = title_element.text.strip() if title_element else ""
-
-            # Extract main content
-            content_div = soup.find('div', {'id': 'mw-content-text'})
-            if not content_div:
-                print(f"No content found for {url}")
-                return None
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
 
-            # Extract text content
-            content = content_div.get_text('\n', strip=True)
-
-            # Extract categories
-            categories = []
-            catlinks_div = soup.find('div', {'id': 'catlinks'})
-            if catlinks_div:
-                for link in catlinks_div.find_all('a'):
-                    cat_name = link.text.strip()
-                    if cat_name and not cat_name.startswith("Category:"):
-                        categories.append(cat_name)
-
-            return {
-                'title': title,
-                'url': url,
-                'content': content,
-                'categories': categories
-            }
+    def parse_page(self, url, response):
+        """Extract the title, content and categories from a downloaded wiki page"""
+        try:
+            if lxml_html is not None:
+                return self._parse_page_lxml(url, response)
+            return self._parse_page_soup(url, response)
 
         except Exception as e:
             print(f"Error processing {url}: {e}")
             return None
 
-        finally:
-            # Be polite
-            time.sleep(2)
+    def _parse_page_lxml(self, url, response):
+        """Extract a page with lxml, giving the same result as _parse_page_soup"""
+        # Tree building and the walk over it run in C, with none of
+        # BeautifulSoup's per-node Python objects
+        parser = lxml_html.HTMLParser(encoding=response.encoding or response.apparent_encoding)
+        root = lxml_html.document_fromstring(response.content, parser=parser)
+
+        # Extract title
+        title_elements = TITLE_XPATH(root)
+        title = "".join(element_strings(title_elements[0])).strip() if title_elements else ""
+
+        # Extract main content
+        content_divs = CONTENT_XPATH(root)
+        if not content_divs:
+            print(f"No content found for {url}")
+            return None
+
+        # Extract text content, one stripped string per line like get_text('\n', strip=True)
+        stripped = (text.strip() for text in element_strings(content_divs[0]))
+        content = '\n'.join(text for text in stripped if text)
+
+        # Extract categories
+        categories = []
+        for link in CATEGORY_LINKS_XPATH(root):
+            cat_name = "".join(element_strings(link)).strip()
+            if cat_name and not cat_name.startswith("Category:"):
+                categories.append(cat_name)
+
+        return {
+            'title': title,
+            'url': url,
+            'content': content,
+            'categories': categories
+        }
+
+    def _parse_page_soup(self, url, response):
+        """Extract a page with BeautifulSoup, used when lxml is not installed"""
+        # Hand the parser the raw bytes: it decodes them as it goes, so no
+        # decoded copy of the whole page is built first. Bytes are also the
+        # smaller form for pages waiting to be parsed, as any non-ASCII
+        # character widens a str to 2 or 4 bytes per character
+        soup = BeautifulSoup(response.content, 'html.parser', parse_only=PAGE_STRAINER,
+                             from_encoding=response.encoding)
+
+        # Extract title
+        title_element = soup.find('h1', {'id': 'firstHeading'})
+        title = title_element.text.strip() if title_element else ""
+
+        # Extract main content
+        content_div = soup.find('div', {'id': 'mw-content-text'})
+        if not content_div:
+            print(f"No content found for {url}")
+            return None
+
+        # Extract text content
+        content = content_div.get_text('\n', strip=True)
+
+        # Extract categories
+        categories = []
+        catlinks_div = soup.find('div', {'id': 'catlinks'})
+        if catlinks_div:
+            for link in catlinks_div.find_all('a'):
+                cat_name = link.text.strip()
+                if cat_name and not cat_name.startswith("Category:"):
+                    categories.append(cat_name)
+
+        return {
+            'title': title,
+            'url': url,
+            'content': content,
+            'categories': categories
+        }
+
+    def _wait_for_turn(self):
+        """Wait until the crawler may send its next request, to be polite to the wiki"""
+        # Each caller reserves the next free slot, so requests from all fetch
+        # threads start at least request_interval apart however long they take
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_request_time - now
+            self._next_request_time = max(now, self._next_request_time) + self.request_interval
+        if wait > 0:
+            time.sleep(wait)
 
     def save_page(self, data):
         """Save page to a file based on URL"""
@@ -162,36 +382,58 @@ class SimpleOSGeoWikiCrawler:
             print(
                 f"Skipping page with too long filename: {data['title']} - URL: {url}")
             # Still add to URL map to record that we encountered this page
-            self.url_map[url] = "SKIPPED_TOO_LONG"
+            self._add_to_url_map(url, "SKIPPED_TOO_LONG")
             return
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"URL: {url}\n")
-            f.write(f"Title: {data['title']}\n")
+        # Build the whole file in memory and write it with a single call
+        parts = [f"URL: {url}\n", f"Title: {data['title']}\n"]
 
-            # Write categories
-            if data['categories']:
-                f.write("\nCategories:\n")
-                for category in data['categories']:
-                    f.write(f"- {category}\n")
+        # Write categories
+        if data['categories']:
+            parts.append("\nCategories:\n")
+            parts.extend(f"- {category}\n" for category in data['categories'])
 
-            f.write("\nContent:\n")
-            f.write(data['content'])
+        parts.append("\nContent:\n")
+        parts.append(data['content'])
 
-        # Add to URL map
-        self.url_map[filename] = url
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write("".join(parts))
 
-        # Save the URL map every 10 pages
-        if len(self.url_map) % 10 == 0:
-            self._save_url_map()
+        # Add to URL map
+        self._add_to_url_map(filename, url)
+        self.url_files.setdefault(url, filename)
+        self.existing_files.add(filename)
 
         print(f"Saved {data['title']} to {filepath}")
 
+    def _add_to_url_map(self, key, value):
+        """Add an entry to the URL map and append it to the URL map log"""
+        self.url_map[key] = value
+        if self._url_map_log is None:
+            self._url_map_log = open(self.url_map_log_file, 'a', encoding='utf-8', buffering=1 << 16)
+        self._url_map_log.write(json.dumps([key, value]) + "\n")
+
     def _save_url_map(self):
-        """Save the URL mapping to a JSON file"""
+        """Save the URL mapping to a JSON file and remove the URL map log"""
         try:
-            with open(self.url_map_file, 'w', encoding='utf-8') as f:
-                json.dump(self.url_map, f, indent=2)
+            if self._url_map_log is not None:
+                self._url_map_log.close()
+                self._url_map_log = None
+            if not self._url_map_loaded:
+                # Keep the new entries in the log for the next run to replay
+                print(f"Not saving URL map, as {self.url_map_file} could not be loaded")
+                return
+            # Write to a temporary file first so an interrupted save keeps the old map
+            temp_file = self.url_map_temp_file
+            if orjson is not None:
+                with open(temp_file, 'wb') as f:
+                    f.write(orjson.dumps(self.url_map, option=orjson.OPT_INDENT_2))
+            else:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.url_map, f, indent=2)
+            os.replace(temp_file, self.url_map_file)
+            if os.path.exists(self.url_map_log_file):
+                os.remove(self.url_map_log_file)
         except Exception as e:
             print(f"Error saving URL map: {e}")
 
@@ -202,30 +444,73 @@ class SimpleOSGeoWikiCrawler:
         if max_pages:
             page_urls = page_urls[:max_pages]
 
+        # Save the URL map at exit if the run is interrupted
+        atexit.register(self._save_url_map)
+
         total_pages = len(page_urls)
         processed = 0
         skipped = 0
         start_time = time.time()
 
-        for i, url in enumerate(page_urls):
-            # Show progress
-            if i % 10 == 0 and i > 0:
-                elapsed = time.time() - start_time
-                pages_per_second = i / elapsed if elapsed > 0 else 0
-                remaining = (total_pages - i) / \
-                    pages_per_second if pages_per_second > 0 else 0
-                print(
-                    f"Progress: {i}/{total_pages} pages - {pages_per_second:.2f} pages/sec - ETA: {remaining:.0f} seconds")
-
-            data = self.extract_page(url)
-            if data:
-                self.save_page(data)
-                processed += 1
-            else:
+        # Skip visited and downloaded pages up front, so the fetch threads
+        # never read the URL map while it is being updated
+        fetch_urls = []
+        for url in page_urls:
+            key = self.url_key(url)
+            if key in self.visited:
                 skipped += 1
+                continue
+            self.visited.add(key)
+            if self.is_already_downloaded(url):
+                print(f"Skipping already downloaded: {url}")
+                skipped += 1
+                continue
+            fetch_urls.append(url)
+
+        # Download pages on a pool of threads sharing the session, while
+        # this thread parses and saves them in order. At most queue_size
+        # downloads are in flight or waiting, which bounds memory use
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = deque()
+            urls = iter(fetch_urls)
+            for url in islice(urls, self.queue_size):
+                pending.append((url, executor.submit(self.download_page, url)))
+
+            i = skipped
+            try:
+                while pending:
+                    url, future = pending.popleft()
+                    next_url = next(urls, None)
+                    if next_url is not None:
+                        pending.append((next_url, executor.submit(self.download_page, next_url)))
+
+                    response = future.result()
+                    data = self.parse_page(url, response) if response is not None else None
+                    i += 1
+
+                    # Show progress
+                    if i % 10 == 0:
+                        elapsed = time.time() - start_time
+                        pages_per_second = i / elapsed if elapsed > 0 else 0
+                        remaining = (total_pages - i) / \
+                            pages_per_second if pages_per_second > 0 else 0
+                        print(
+                            f"Progress: {i}/{total_pages} pages - {pages_per_second:.2f} pages/sec - ETA: {remaining:.0f} seconds")
+
+                    if data:
+                        self.save_page(data)
+                        processed += 1
+                    else:
+                        skipped += 1
+            finally:
+                # On an error or Ctrl-C, drop the downloads not started yet
+                # rather than waiting for each of them on the way out
+                for _, future in pending:
+                    future.cancel()
 
         # Make sure to save the URL map at the end
         self._save_url_map()
+        atexit.unregister(self._save_url_map)
 
         print(
             f"Crawling complete. Processed {processed} pages, skipped {skipped} pages.")
@@ -11,7 +11,9 @@ Stores content in source_pages and queues tasks for processing.
 
 import os
 import sys
+import functools
 import hashlib
+import io
 import logging
 import re
 import requests
@@ -20,9 +22,18 @@ import xml.etree.ElementTree as ET
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+from email.utils import parsedate_to_datetime
 from html.parser import HTMLParser
 from dotenv import load_dotenv
 
+# lxml is optional; without it the feed is parsed with xml.etree.ElementTree
+# and post HTML with html.parser
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -39,10 +50,27 @@ PLANET_RSS_URL = "https://planet.osgeo.org/rss20.xml"
 PLANET_ATOM_URL = "https://planet.osgeo.org/atom.xml"
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
+TASK_TYPES = ("chunks", "extensions")  # Processing tasks queued for each new or changed post
+
+# Escapes for values in COPY's text format
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
 
 # Namespaces for Atom parsing
 ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
 
+# html_to_text: tags whose text is dropped, tags that start or end a line,
+# and runs of blank lines collapsed in the result
+NON_TEXT_TAGS = frozenset({"script", "style"})
+BLOCK_START_TAGS = frozenset({"p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li"})
+BLOCK_END_TAGS = frozenset({"p", "div", "h1", "h2", "h3", "h4", "h5", "h6"})
+MULTI_NEWLINE_RE = re.compile(r"\n{3,}")
+
+# Errors raised while parsing a feed, by either XML backend
+if etree is not None:
+    XML_PARSE_ERRORS = (etree.XMLSyntaxError, ET.ParseError)
+else:
+    XML_PARSE_ERRORS = (ET.ParseError,)
+
 
 def url_to_source_id(url: str) -> int:
     """
@@ -86,6 +114,55 @@ def get_db_connection():
 
 def html_to_text(html: str) -> str:
     """Convert HTML to plain text, preserving structure."""
+    if etree is not None:
+        try:
+            return _html_to_text_lxml(html)
+        except Exception:
+            # Fall back to html.parser for anything lxml refuses, such as
+            # empty documents
+            pass
+    return _html_to_text_htmlparser(html)
+
+
+def _html_to_text_lxml(html: str) -> str:
+    """Convert HTML to plain text with lxml's C parser."""
+    root = lxml_html.document_fromstring(html)
+    text = []
+    hidden = 0  # Depth inside a script or style element
+
+    for event, node in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        if event == "start":
+            if hidden or node.tag in NON_TEXT_TAGS:
+                hidden += 1
+                continue
+            if node.tag in BLOCK_START_TAGS:
+                text.append("\n")
+            if node.text:
+                text.append(node.text)
+            continue
+
+        if event == "end":
+            if hidden:
+                hidden -= 1
+                if hidden:
+                    continue
+            elif node.tag in BLOCK_END_TAGS:
+                text.append("\n")
+        elif hidden:
+            # Comments and processing instructions inside a script or style
+            continue
+
+        if node is not root and node.tail:
+            text.append(node.tail)
+
+    text = "".join(text)
+    # Clean up multiple newlines
+    text = MULTI_NEWLINE_RE.sub("\n\n", text)
+    return text.strip()
+
+
+def _html_to_text_htmlparser(html: str) -> str:
+    """Convert HTML to plain text with the pure-Python html.parser."""
 
     class TextExtractor(HTMLParser):
         def __init__(self):
@@ -95,15 +172,15 @@ def html_to_text(html: str) -> str:
             self.in_style = False
 
         def handle_starttag(self, tag, attrs):
-            if tag in ("script", "style"):
+            if tag in NON_TEXT_TAGS:
                 self.in_script = True
-            elif tag in ("p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li"):
+            elif tag in BLOCK_START_TAGS:
                 self.text.append("\n")
 
         def handle_endtag(self, tag):
-            if tag in ("script", "style"):
+            if tag in NON_TEXT_TAGS:
                 self.in_script = False
-            elif tag in ("p", "div", "h1", "h2", "h3", "h4", "h5", "h6"):
+            elif tag in BLOCK_END_TAGS:
                 self.text.append("\n")
 
         def handle_data(self, data):
@@ -118,36 +195,94 @@ def html_to_text(html: str) -> str:
         return html
     text = "".join(parser.text)
     # Clean up multiple newlines
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = MULTI_NEWLINE_RE.sub("\n\n", text)
     return text.strip()
 
 
+def iter_rss_items(xml_content: bytes):
+    """
+    Yield the <item> elements of an RSS feed's channel as they are parsed.
+
+    The feed is parsed incrementally, with lxml when it is installed, and
+    each item is removed from the tree once the caller moves on, so the
+    whole feed is never held as a tree.
+
+    Args:
+        xml_content: The raw document, so its encoding declaration is honoured
+    """
+    if etree is not None:
+        # Feeds are parsed without resolving external entities
+        events = etree.iterparse(
+            io.BytesIO(xml_content),
+            events=("start", "end"),
+            resolve_entities=False,
+            no_network=True,
+        )
+    else:
+        events = ET.iterparse(io.BytesIO(xml_content), events=("start", "end"))
+
+    # Only the items of the root's first <channel> child are feed entries
+    channel = None
+    path = []
+    for event, elem in events:
+        if event == "start":
+            if channel is None and len(path) == 1 and elem.tag == "channel":
+                channel = elem
+            path.append(elem)
+            continue
+
+        path.pop()
+        if elem.tag == "item" and len(path) == 2 and path[1] is channel:
+            yield elem
+            channel.remove(elem)
+
+    if channel is None:
+        logger.error("No channel element found in RSS feed")
+
+
+@functools.lru_cache(maxsize=2048)
 def parse_rss_date(date_str: str) -> Optional[datetime]:
-    """Parse RSS date string to datetime."""
-    # Try common RSS date formats
-    formats = [
-        "%a, %d %b %Y %H:%M:%S %z",  # RFC 822
-        "%a, %d %b %Y %H:%M:%S %Z",  # RFC 822 with timezone name
-        "%Y-%m-%dT%H:%M:%S%z",  # ISO 8601
-        "%Y-%m-%dT%H:%M:%SZ",  # ISO 8601 UTC
-        "%Y-%m-%d %H:%M:%S",  # Simple format
-    ]
-
-    for fmt in formats:
+    """Parse RSS date string to datetime, assuming UTC when it has no timezone."""
+    # RFC 822 dates, the RSS format, then ISO 8601, with the C-implemented
+    # parsers; a feed's dates are also cached, as they repeat between syncs
+    dt = None
+    try:
+        dt = parsedate_to_datetime(date_str)
+    except (TypeError, ValueError, IndexError):
         try:
-            return datetime.strptime(date_str, fmt)
+            dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
         except ValueError:
-            continue
+            pass
+
+    if dt is None:
+        # Try other common RSS date formats
+        formats = [
+            "%a, %d %b %Y %H:%M:%S %z",  # RFC 822
+            "%a, %d %b %Y %H:%M:%S %Z",  # RFC 822 with timezone name
+            "%Y-%m-%dT%H:%M:%S%z",  # ISO 8601
+            "%Y-%m-%dT%H:%M:%SZ",  # ISO 8601 UTC
+            "%Y-%m-%d %H:%M:%S",  # Simple format
+        ]
+
+        for fmt in formats:
+            try:
+                dt = datetime.strptime(date_str, fmt)
+                break
+            except ValueError:
+                continue
 
-    # Try parsing without timezone
-    try:
-        dt = datetime.strptime(date_str[:19], "%Y-%m-%dT%H:%M:%S")
-        return dt.replace(tzinfo=timezone.utc)
-    except ValueError:
-        pass
+    if dt is None:
+        # Try parsing without timezone
+        try:
+            dt = datetime.strptime(date_str[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            logger.warning(f"Could not parse date: {date_str}")
+            return None
 
-    logger.warning(f"Could not parse date: {date_str}")
-    return None
+    # Dates are compared with an aware cutoff, so naive ones are taken as UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
 
 
 class PlanetSyncClient:
@@ -160,13 +295,13 @@ class PlanetSyncClient:
         )
         self.db = db_connection
 
-    def fetch_feed(self) -> Optional[str]:
-        """Fetch the RSS feed XML."""
+    def fetch_feed(self) -> Optional[bytes]:
+        """Fetch the RSS feed XML, undecoded."""
         for attempt in range(MAX_RETRIES):
             try:
                 response = self.session.get(PLANET_RSS_URL, timeout=60)
                 response.raise_for_status()
-                return response.text
+                return response.content
             except requests.RequestException as e:
                 logger.warning(
                     f"Failed to fetch feed (attempt {attempt + 1}/{MAX_RETRIES}): {e}"
@@ -177,7 +312,7 @@ class PlanetSyncClient:
                     time.sleep(RETRY_DELAY * (attempt + 1))
         return None
 
-    def parse_rss_feed(self, xml_content: str) -> list[dict]:
+    def parse_rss_feed(self, xml_content: bytes) -> list[dict]:
         """
         Parse RSS 2.0 feed and extract entries.
 
@@ -194,60 +329,57 @@ class PlanetSyncClient:
         entries = []
 
         try:
-            root = ET.fromstring(xml_content)
-        except ET.ParseError as e:
+            for item in iter_rss_items(xml_content):
+                entry = self._parse_rss_item(item)
+                if entry:
+                    entries.append(entry)
+        except XML_PARSE_ERRORS as e:
             logger.error(f"Failed to parse XML: {e}")
-            return entries
-
-        channel = root.find("channel")
-        if channel is None:
-            logger.error("No channel element found in RSS feed")
-            return entries
-
-        for item in channel.findall("item"):
-            try:
-                # Get basic fields
-                guid = item.findtext("guid", "")
-                title = item.findtext("title", "")
-                link = item.findtext("link", "")
-
-                # Get content - try description first
-                content = item.findtext("description", "")
-
-                # Get publication date
-                pub_date_str = item.findtext("pubDate", "")
-                pub_date = parse_rss_date(pub_date_str) if pub_date_str else None
-
-                # Extract source blog from title (format: "Blog Name: Post Title")
-                source_blog = ""
-                if ": " in title:
-                    parts = title.split(": ", 1)
-                    if len(parts) == 2:
-                        source_blog = parts[0]
-                        # Keep the full title for searchability
-
-                # Skip if no content
-                if not content or len(content.strip()) < 50:
-                    logger.debug(f"Skipping {title}: insufficient content")
-                    continue
-
-                entries.append(
-                    {
-                        "id": guid,
-                        "title": title,
-                        "link": link,
-                        "content": content,
-                        "published": pub_date,
-                        "source_blog": source_blog,
-                    }
-                )
-
-            except Exception as e:
-                logger.warning(f"Error parsing item: {e}")
-                continue
+            return []
 
         return entries
 
+    def _parse_rss_item(self, item) -> Optional[dict]:
+        """Extract an entry from an RSS <item>, or None if it is skipped."""
+        try:
+            # Get basic fields
+            guid = item.findtext("guid", "")
+            title = item.findtext("title", "")
+            link = item.findtext("link", "")
+
+            # Get content - try description first
+            content = item.findtext("description", "")
+
+            # Get publication date
+            pub_date_str = item.findtext("pubDate", "")
+            pub_date = parse_rss_date(pub_date_str) if pub_date_str else None
+
+            # Extract source blog from title (format: "Blog Name: Post Title")
+            source_blog = ""
+            if ": " in title:
+                parts = title.split(": ", 1)
+                if len(parts) == 2:
+                    source_blog = parts[0]
+                    # Keep the full title for searchability
+
+            # Skip if no content
+            if not content or len(content.strip()) < 50:
+                logger.debug(f"Skipping {title}: insufficient content")
+                return None
+
+            return {
+                "id": guid,
+                "title": title,
+                "link": link,
+                "content": content,
+                "published": pub_date,
+                "source_blog": source_blog,
+            }
+
+        except Exception as e:
+            logger.warning(f"Error parsing item: {e}")
+            return None
+
     def compute_content_hash(self, content: str) -> str:
         """Compute SHA256 hash of content."""
         return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -316,7 +448,12 @@ class PlanetSyncClient:
             entries = entries[:max_entries]
             logger.info(f"Limited to {max_entries} entries")
 
-        # Process each entry
+        # Look up the stored hashes of all entries with one query
+        stored_hashes = {} if dry_run else self._get_stored_hashes([e["id"] for e in entries])
+
+        # Process each entry; changed entries are written together afterwards
+        changed = []
+        html_hashes = []  # (source_id, html_hash) of entries whose text is unchanged
         for entry in entries:
             try:
                 entry_id = entry["id"]
@@ -332,43 +469,62 @@ class PlanetSyncClient:
                     stats["entries_updated"] += 1
                     continue
 
+                # Check if we already have this version, first by the raw
+                # HTML so unchanged posts skip the HTML-to-text conversion
+                stored_hash, stored_html_hash = stored_hashes.get(entry_id, (None, None))
+                html_hash = self.compute_content_hash(html_content)
+
+                if stored_html_hash == html_hash:
+                    logger.debug(f"  Skipping (HTML unchanged)")
+                    stats["entries_skipped"] += 1
+                    continue
+
                 # Convert HTML to text
                 text_content = html_to_text(html_content)
-
-                # Check if we already have this version
                 content_hash = self.compute_content_hash(text_content)
-                stored_hash = self._get_stored_hash(entry_id)
 
                 if stored_hash == content_hash:
                     logger.debug(f"  Skipping (content unchanged)")
                     stats["entries_skipped"] += 1
+                    # Record the HTML hash, so the next sync skips it earlier
+                    html_hashes.append((url_to_source_id(entry_id), html_hash))
                     continue
 
-                is_new = stored_hash is None
-
-                # Update database
-                tasks_queued = self._update_entry(
-                    entry_id=entry_id,
-                    title=title,
-                    url=link,
-                    html_content=html_content,
-                    text_content=text_content,
-                    content_hash=content_hash,
-                    source_blog=source_blog,
-                    published=entry.get("published"),
+                changed.append(
+                    {
+                        "entry_id": entry_id,
+                        "title": title,
+                        "url": link,
+                        "text_content": text_content,
+                        "content_hash": content_hash,
+                        "html_hash": html_hash,
+                        "source_blog": source_blog,
+                        "published": entry.get("published"),
+                        "is_new": stored_hash is None,
+                    }
                 )
-                stats["tasks_queued"] += tasks_queued
-
-                if is_new:
-                    stats["entries_created"] += 1
-                else:
-                    stats["entries_updated"] += 1
 
             except Exception as e:
                 title = entry.get("title", entry.get("id", "unknown"))
                 logger.error(f"Error processing {title}: {e}")
                 stats["errors"].append(f"{title[:50]}: {str(e)}")
 
+        # Update database
+        if html_hashes:
+            self._update_html_hashes(html_hashes)
+
+        if changed:
+            try:
+                stats["tasks_queued"] += self._update_entries(changed)
+                for entry in changed:
+                    if entry["is_new"]:
+                        stats["entries_created"] += 1
+                    else:
+                        stats["entries_updated"] += 1
+            except Exception as e:
+                logger.error(f"Error writing {len(changed)} entries: {e}")
+                stats["errors"].append(f"Writing {len(changed)} entries: {str(e)}")
+
         stats["completed_at"] = datetime.now(timezone.utc).isoformat()
         logger.info(
             f"Sync complete: {stats['entries_created']} created, "
@@ -378,42 +534,71 @@ class PlanetSyncClient:
 
         return stats
 
-    def _get_stored_hash(self, entry_id: str) -> Optional[str]:
-        """Get stored content hash for a Planet entry."""
-        if self.db is None:
-            return None
+    def _get_stored_hashes(
+        self, entry_ids: list[str]
+    ) -> dict[str, tuple[Optional[str], Optional[str]]]:
+        """Get the stored (content hash, HTML hash) of the Planet entries among entry_ids."""
+        if self.db is None or not entry_ids:
+            return {}
+
+        # Convert URL/GUID to integer source_id
+        entries_by_source_id = {}
+        for entry_id in entry_ids:
+            entries_by_source_id.setdefault(url_to_source_id(entry_id), []).append(entry_id)
 
         try:
-            # Convert URL/GUID to integer source_id
-            source_id = url_to_source_id(entry_id)
+            with self.db.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT source_id, content_hash, html_hash FROM source_pages
+                    WHERE source_type = 'planet_post' AND source_id = ANY(%s)
+                    """,
+                    (list(entries_by_source_id),),
+                )
+                return {
+                    entry_id: (content_hash, html_hash)
+                    for source_id, content_hash, html_hash in cur.fetchall()
+                    for entry_id in entries_by_source_id[source_id]
+                }
+        except psycopg2.Error as e:
+            logger.error(f"Error getting stored hashes: {e}")
+            return {}
+
+    def _update_html_hashes(self, html_hashes: list[tuple[int, str]]):
+        """Store the HTML hashes of Planet entries whose text was unchanged."""
+        if self.db is None:
+            return
 
+        try:
             with self.db.cursor() as cur:
+                source_ids, hashes = zip(*html_hashes)
                 cur.execute(
                     """
-                    SELECT content_hash FROM source_pages
-                    WHERE source_type = 'planet_post' AND source_id = %s
+                    UPDATE source_pages AS sp SET html_hash = v.html_hash
+                    FROM unnest(%s::integer[], %s::text[]) AS v (source_id, html_hash)
+                    WHERE sp.source_type = 'planet_post' AND sp.source_id = v.source_id
                     """,
-                    (source_id,),
+                    (list(source_ids), list(hashes)),
                 )
-                result = cur.fetchone()
-                return result[0] if result else None
+            self.db.commit()
         except psycopg2.Error as e:
-            logger.error(f"Error getting stored hash: {e}")
-            return None
+            self.db.rollback()
+            logger.error(f"Error storing HTML hashes: {e}")
 
-    def _update_entry(
-        self,
-        entry_id: str,
-        title: str,
-        url: str,
-        html_content: str,
-        text_content: str,
-        content_hash: str,
-        source_blog: str,
-        published: Optional[datetime],
-    ) -> int:
+    def _update_entries(self, entries: list[dict]) -> int:
         """
-        Update entry in database and queue processing tasks.
+        Write entries to the database and queue their processing tasks.
+
+        Each table is upserted with one statement, the post content being
+        loaded with COPY, and everything is committed together, instead of
+        a round trip per row and a commit per entry. The other statements
+        take their rows as column arrays expanded with unnest(), so their
+        text does not depend on the batch size and is parsed and planned
+        once per sync.
+
+        Args:
+            entries: Dicts with entry_id, title, url, text_content,
+                content_hash, html_hash and source_blog
 
         Returns:
             Number of tasks queued
@@ -422,73 +607,110 @@ class PlanetSyncClient:
             logger.warning("No database connection, skipping database update")
             return 0
 
-        tasks_queued = 0
+        # An upsert may only touch a row once, so keep the last entry for
+        # each URL and each source_id
+        page_titles = {entry["url"]: entry["title"] for entry in entries}
+        # source_id is derived from hashing the RSS GUID/URL to an integer
+        source_entries = {url_to_source_id(entry["entry_id"]): entry for entry in entries}
 
         try:
-            # Convert URL/GUID to integer source_id
-            source_id = url_to_source_id(entry_id)
-
             with self.db.cursor() as cur:
                 # 1. Upsert into pages table (lightweight reference)
                 cur.execute(
                     """
                     INSERT INTO pages (title, url)
-                    VALUES (%s, %s)
+                    SELECT * FROM unnest(%s::text[], %s::text[])
                     ON CONFLICT (url) DO UPDATE SET
                         title = EXCLUDED.title,
                         last_crawled = CURRENT_TIMESTAMP
-                    RETURNING id
+                    RETURNING id, url
                     """,
-                    (title, url),
+                    (list(page_titles.values()), list(page_titles)),
                 )
-                pages_table_id = cur.fetchone()[0]
+                rows = cur.fetchall()
+                pages_table_ids = {url: page_id for page_id, url in rows}
+
+                # 2. Upsert into source_pages with the post text. The raw
+                # HTML is not stored: only html_hash is needed to detect
+                # changes, and any copy left by older syncs is cleared. The
+                # text is streamed into a temporary table with COPY, then
+                # upserted from it in one statement
+                cur.execute(
+                    """
+                    CREATE TEMP TABLE planet_source_pages (
+                        source_id INTEGER,
+                        title TEXT,
+                        url TEXT,
+                        content_hash TEXT,
+                        html_hash TEXT,
+                        content_text TEXT
+                    ) ON COMMIT DROP
+                    """
+                )
+                buf = io.StringIO()
+                for source_id, entry in source_entries.items():
+                    row = (
+                        str(source_id),
+                        entry["title"],
+                        entry["url"],
+                        entry["content_hash"],
+                        entry["html_hash"],
+                        entry["text_content"],
+                    )
+                    buf.write("\t".join(value.translate(COPY_ESCAPES) for value in row))
+                    buf.write("\n")
+                buf.seek(0)
+                cur.copy_expert("COPY planet_source_pages FROM STDIN", buf)
 
-                # 2. Upsert into source_pages with full content
-                # source_id is derived from hashing the RSS GUID/URL to an integer
                 cur.execute(
                     """
                     INSERT INTO source_pages (
-                        source_type, source_id, title, url,
-                        content_hash, content_text, content_html, last_synced
+                        source_type, source_id, title, url, content_hash,
+                        html_hash, content_text, last_synced
                     )
-                    VALUES ('planet_post', %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    SELECT 'planet_post', source_id, title, url, content_hash,
+                        html_hash, content_text, CURRENT_TIMESTAMP
+                    FROM planet_source_pages
                     ON CONFLICT (source_type, source_id) DO UPDATE SET
                         title = EXCLUDED.title,
                         url = EXCLUDED.url,
                         content_hash = EXCLUDED.content_hash,
+                        html_hash = EXCLUDED.html_hash,
                         content_text = EXCLUDED.content_text,
-                        content_html = EXCLUDED.content_html,
+                        content_html = NULL,
                         last_synced = CURRENT_TIMESTAMP,
                         status = 'active'
-                    RETURNING id
-                    """,
-                    (
-                        source_id,
-                        title,
-                        url,
-                        content_hash,
-                        text_content,
-                        html_content,
-                    ),
+                    RETURNING id, source_id
+                    """
                 )
-                source_page_id = cur.fetchone()[0]
+                rows = cur.fetchall()
+                source_page_ids = {source_id: page_id for page_id, source_id in rows}
 
                 # 3. Queue processing tasks
-                for task_type in ["chunks", "extensions"]:
-                    cur.execute(
-                        "SELECT queue_task(%s, %s, %s, %s)",
-                        (pages_table_id, source_page_id, task_type, 0),
-                    )
-                    queue_id = cur.fetchone()[0]
-                    if queue_id:
-                        tasks_queued += 1
-                        logger.debug(f"  Queued {task_type} task (id={queue_id})")
+                tasks = [
+                    (pages_table_ids[entry["url"]], source_page_ids[source_id], task_type)
+                    for source_id, entry in source_entries.items()
+                    for task_type in TASK_TYPES
+                ]
+                cur.execute(
+                    """
+                    SELECT queue_task(t.page_id, t.source_page_id, t.task_type, 0)
+                    FROM unnest(%s::integer[], %s::integer[], %s::text[])
+                        AS t (page_id, source_page_id, task_type)
+                    """,
+                    [list(column) for column in zip(*tasks)],
+                )
+                rows = cur.fetchall()
+                tasks_queued = sum(1 for (queue_id,) in rows if queue_id)
 
                 self.db.commit()
 
+            for entry in source_entries.values():
+                source_blog = entry["source_blog"]
                 logger.info(
-                    f"  Updated (hash={content_hash[:8]}..., blog={source_blog[:20] if source_blog else 'N/A'}, tasks={tasks_queued})"
+                    f"  Updated {entry['title'][:60]} (hash={entry['content_hash'][:8]}..., blog={source_blog[:20] if source_blog else 'N/A'})"
                 )
+            logger.info(f"Wrote {len(source_entries)} entries, {tasks_queued} tasks queued")
 
         except psycopg2.Error as e:
             self.db.rollback()
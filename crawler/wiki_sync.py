@@ -35,7 +35,7 @@ logger = logging.getLogger(__name__)
 # Configuration
 WIKI_API_URL = "https://wiki.osgeo.org/w/api.php"
 WIKI_BASE_URL = "https://wiki.osgeo.org/wiki/"
-DEFAULT_LIMIT = 50
+DEFAULT_LIMIT = 500  # Changes per API request (the maximum for non-bot users)
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 WIKI_DUMP_PATH = Path(os.getenv("WIKI_DUMP_PATH", "./wiki_dump"))
@@ -210,21 +210,27 @@ class WikiSyncClient:
         return latest_by_page
 
     def filter_already_processed(
-        self, changes: dict[int, PageChange]
+        self,
+        changes: dict[int, PageChange],
+        stored_revids: Optional[dict[int, Optional[int]]] = None,
     ) -> list[PageChange]:
         """
         Filter out pages we've already processed at this revision
 
         Args:
             changes: Dict of pageid -> PageChange
+            stored_revids: Stored revision IDs by pageid (default: looked up)
 
         Returns:
             List of PageChange that need processing
         """
+        if stored_revids is None:
+            stored_revids = self._get_stored_revids(list(changes))
+
         to_update = []
 
         for pageid, change in changes.items():
-            stored_revid = self._get_stored_revid(pageid)
+            stored_revid = stored_revids.get(pageid)
 
             if stored_revid is None:
                 logger.debug(f"New page: {change.title} (pageid={pageid})")
@@ -317,8 +323,9 @@ class WikiSyncClient:
         # 2. Deduplicate
         unique_changes = self.deduplicate_changes(changes)
 
-        # 3. Filter already processed
-        to_update = self.filter_already_processed(unique_changes)
+        # 3. Filter already processed, looking up all stored revisions in one query
+        stored_revids = self._get_stored_revids(list(unique_changes))
+        to_update = self.filter_already_processed(unique_changes, stored_revids)
         stats["pages_skipped"] = len(unique_changes) - len(to_update)
 
         if not to_update:
@@ -345,7 +352,7 @@ class WikiSyncClient:
                     continue
 
                 # Check if this is new or update
-                is_new = self._get_stored_revid(change.pageid) is None
+                is_new = stored_revids.get(change.pageid) is None
 
                 # Update database and queue tasks
                 tasks_queued = self._update_page(change, page_data)
@@ -385,25 +392,24 @@ class WikiSyncClient:
                     time.sleep(RETRY_DELAY * (attempt + 1))
         return None
 
-    def _get_stored_revid(self, pageid: int) -> Optional[int]:
-        """Get the last processed revision ID for a page."""
-        if self.db is None:
-            return None
+    def _get_stored_revids(self, pageids: list[int]) -> dict[int, Optional[int]]:
+        """Get the last processed revision IDs of the stored pages among pageids."""
+        if self.db is None or not pageids:
+            return {}
 
         try:
             with self.db.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT last_revid FROM source_pages
-                    WHERE source_type = 'wiki' AND source_id = %s
+                    SELECT source_id, last_revid FROM source_pages
+                    WHERE source_type = 'wiki' AND source_id = ANY(%s)
                     """,
-                    (pageid,),
+                    (pageids,),
                 )
-                result = cur.fetchone()
-                return result[0] if result else None
+                return dict(cur.fetchall())
         except psycopg2.Error as e:
-            logger.error(f"Error getting stored revid: {e}")
-            return None
+            logger.error(f"Error getting stored revids: {e}")
+            return {}
 
     def _save_to_wiki_dump(self, change: PageChange, page_data: dict):
         """Save page content to wiki_dump directory (for compatibility with existing scripts)."""
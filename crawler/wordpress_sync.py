@@ -40,6 +40,16 @@ MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 REQUEST_DELAY = 1  # seconds between requests to be nice to the server
 
+# html_to_text: tags whose text is dropped, tags that start or end a line,
+# and runs of blank lines collapsed in the result
+NON_TEXT_TAGS = frozenset({"script", "style"})
+BLOCK_START_TAGS = frozenset({"p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li"})
+BLOCK_END_TAGS = frozenset({"p", "div", "h1", "h2", "h3", "h4", "h5", "h6"})
+MULTI_NEWLINE_RE = re.compile(r"\n{3,}")
+
+# Inner HTML of the <main> element, for extract_main_content
+MAIN_CONTENT_RE = re.compile(r"<main[^>]*>(.*?)</main>", re.DOTALL | re.IGNORECASE)
+
 
 def get_db_connection():
     """Connect to PostgreSQL database."""
@@ -70,15 +80,15 @@ def html_to_text(html: str) -> str:
             self.in_style = False
 
         def handle_starttag(self, tag, attrs):
-            if tag in ("script", "style"):
+            if tag in NON_TEXT_TAGS:
                 self.in_script = True
-            elif tag in ("p", "div", "br", "h1", "h2", "h3", "h4", "h5", "h6", "li"):
+            elif tag in BLOCK_START_TAGS:
                 self.text.append("\n")
 
         def handle_endtag(self, tag):
-            if tag in ("script", "style"):
+            if tag in NON_TEXT_TAGS:
                 self.in_script = False
-            elif tag in ("p", "div", "h1", "h2", "h3", "h4", "h5", "h6"):
+            elif tag in BLOCK_END_TAGS:
                 self.text.append("\n")
 
         def handle_data(self, data):
@@ -89,7 +99,7 @@ def html_to_text(html: str) -> str:
     parser.feed(html)
     text = "".join(parser.text)
     # Clean up multiple newlines
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = MULTI_NEWLINE_RE.sub("\n\n", text)
     return text.strip()
 
 
@@ -100,7 +110,7 @@ def extract_main_content(html: str) -> Optional[str]:
     Returns the inner HTML of the <main> tag, or None if not found.
     """
     # Find <main ...> tag and extract content until </main>
-    main_match = re.search(r"<main[^>]*>(.*?)</main>", html, re.DOTALL | re.IGNORECASE)
+    main_match = MAIN_CONTENT_RE.search(html)
     if main_match:
         return main_match.group(1)
     return None
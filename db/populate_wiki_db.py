@@ -2,7 +2,9 @@
 import os
 import sys
 import re
+import io
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
 from pathlib import Path
 import json
 from dotenv import load_dotenv
@@ -13,6 +15,18 @@ load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
 # Define constants
 CHUNK_SIZE = 500  # Characters per chunk
 CATEGORY_BLACKLIST = ['Categories', 'Category']  # Categories to ignore
+BATCH_SIZE = 200  # Pages per transaction
+# Patterns used for every wiki file, compiled once. The header lines are
+# matched with a negated class, which needs no lazy backtracking to find
+# the end of the line
+URL_RE = re.compile(r'URL: ([^\n]*)\n')
+TITLE_RE = re.compile(r'Title: ([^\n]*)\n')
+CATEGORIES_RE = re.compile(r'Categories:\n(.*?)\n\nContent:', re.DOTALL)
+CONTENT_RE = re.compile(r'Content:\n(.*)', re.DOTALL)
+PARAGRAPH_SPLIT_RE = re.compile(r'\n\n+')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+# Escapes for values in COPY's text format
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
 
 def get_db_connection():
     """Connect to the PostgreSQL database."""
@@ -26,9 +40,8 @@ def get_db_connection():
             "port": os.getenv("DB_PORT", "5432")
         }
         
-        # Connect to the database
+        # Connect to the database; main() commits the pages in batches
         conn = psycopg2.connect(**db_params)
-        conn.autocommit = True
         return conn
     except psycopg2.Error as e:
         print(f"Error connecting to PostgreSQL database: {e}")
@@ -51,20 +64,19 @@ def parse_wiki_file(file_path):
         content = f.read()
     
     # Extract basic metadata
-    url_match = re.search(r'URL: (.*?)\n', content)
-    title_match = re.search(r'Title: (.*?)\n', content)
+    url_match = URL_RE.search(content)
+    title_match = TITLE_RE.search(content)
     
     # Extract categories
     categories = []
-    categories_section = re.search(r'Categories:\n(.*?)\n\nContent:', 
-                                 content, re.DOTALL)
+    categories_section = CATEGORIES_RE.search(content)
     if categories_section:
         categories_text = categories_section.group(1)
         categories = [cat.strip('- \n') for cat in categories_text.split('\n')
                      if cat.strip('- \n')]
     
     # Extract main content
-    content_match = re.search(r'Content:\n(.*)', content, re.DOTALL)
+    content_match = CONTENT_RE.search(content)
     main_content = content_match.group(1) if content_match else ""
     
     return {
@@ -81,7 +93,7 @@ def chunk_content(content, chunk_size=CHUNK_SIZE):
     current_chunk = ""
     
     # Split by paragraphs
-    paragraphs = re.split(r'\n\n+', content)
+    paragraphs = PARAGRAPH_SPLIT_RE.split(content)
     
     for para in paragraphs:
         if not para.strip():
@@ -98,7 +110,7 @@ def chunk_content(content, chunk_size=CHUNK_SIZE):
             # If the paragraph itself is longer than chunk_size, split it
             if len(para) > chunk_size:
                 # Simple approach: split by sentences
-                sentences = re.split(r'(?<=[.!?])\s+', para)
+                sentences = SENTENCE_SPLIT_RE.split(para)
                 current_chunk = ""
                 
                 for sentence in sentences:
@@ -175,17 +187,25 @@ def clear_page_categories(conn, page_id):
         print(f"Error clearing page categories: {e}")
         return False
 
+def copy_rows(cur, table, columns, rows):
+    """Load rows into a table with a single COPY instead of one INSERT per row."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write('\t'.join(str(value).translate(COPY_ESCAPES) for value in row))
+        buf.write('\n')
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
 def insert_page_chunks(conn, page_id, content):
     """Split content into chunks and insert them."""
     chunks = chunk_content(content)
     
     try:
         with conn.cursor() as cur:
-            for i, chunk_text in enumerate(chunks):
-                cur.execute(
-                    "INSERT INTO page_chunks (page_id, chunk_index, chunk_text) VALUES (%s, %s, %s)",
-                    (page_id, i, chunk_text)
-                )
+            copy_rows(
+                cur, "page_chunks", ("page_id", "chunk_index", "chunk_text"),
+                ((page_id, i, chunk_text) for i, chunk_text in enumerate(chunks))
+            )
             return True
     except psycopg2.Error as e:
         print(f"Error inserting page chunks: {e}")
@@ -198,11 +218,10 @@ def insert_page_categories(conn, page_id, categories):
     
     try:
         with conn.cursor() as cur:
-            for category in categories:
-                cur.execute(
-                    "INSERT INTO page_categories (page_id, category_name) VALUES (%s, %s)",
-                    (page_id, category)
-                )
+            copy_rows(
+                cur, "page_categories", ("page_id", "category_name"),
+                ((page_id, category) for category in categories)
+            )
             return True
     except psycopg2.Error as e:
         print(f"Error inserting page categories: {e}")
@@ -281,6 +300,28 @@ def process_page(conn, page_data):
     
     return True
 
+def process_page_atomically(conn, page_data):
+    """Process a page inside a savepoint, undoing all its changes if a statement fails."""
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT page")
+    
+    try:
+        success = process_page(conn, page_data)
+    except Exception:
+        with conn.cursor() as cur:
+            cur.execute("ROLLBACK TO SAVEPOINT page")
+        raise
+    
+    # The helpers above report database errors and carry on, so check
+    # whether one of them left the transaction aborted
+    with conn.cursor() as cur:
+        if conn.info.transaction_status == TRANSACTION_STATUS_INERROR:
+            cur.execute("ROLLBACK TO SAVEPOINT page")
+            print(f"Rolled back page after a database error: {page_data['title']}")
+            return False
+        cur.execute("RELEASE SAVEPOINT page")
+    return success
+
 def main():
     print("=== OSGeo Wiki Database Population ===")
     
@@ -313,12 +354,18 @@ def main():
         # Parse and process the file
         try:
             page_data = parse_wiki_file(file_path)
-            if process_page(conn, page_data):
+            if process_page_atomically(conn, page_data):
                 success += 1
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
         
         processed += 1
+        
+        # Commit a batch of pages at a time rather than every statement
+        if processed % BATCH_SIZE == 0:
+            conn.commit()
+    
+    conn.commit()
     
     print(f"\nPopulation complete!")
     print(f"Processed {processed} files")
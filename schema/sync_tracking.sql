@@ -55,6 +55,10 @@ CREATE TABLE IF NOT EXISTS page_update_log (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- SHA256 of the raw HTML (Planet posts), so unchanged posts are skipped
+-- before their HTML is converted to text
+ALTER TABLE source_pages ADD COLUMN IF NOT EXISTS html_hash TEXT;
+
 -- Indexes for efficient queries
 CREATE INDEX IF NOT EXISTS idx_source_pages_type_id ON source_pages(source_type, source_id);
 CREATE INDEX IF NOT EXISTS idx_source_pages_status ON source_pages(status);
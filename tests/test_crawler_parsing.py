@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# test_crawler_parsing.py - Check that the crawler's lxml and BeautifulSoup parse paths agree
+#
+# The crawler extracts pages with lxml when it is installed and falls back to
+# BeautifulSoup otherwise. The lxml path reproduces BeautifulSoup's get_text()
+# output, so a wiki dump does not depend on which one ran. Run this after
+# upgrading lxml or bs4.
+#
+# The fixtures are well-formed, as MediaWiki's output is: the fallback uses
+# html.parser, which repairs broken markup differently from lxml. For the
+# same reason they contain no CDATA sections, whose text html.parser keeps
+# and lxml drops as a comment.
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler'))
+import crawler
+
+# Article pages laid out like MediaWiki's, each exercising a text extraction rule
+FIXTURES = {
+    "inline markup": """<!DOCTYPE html><html><head><title>T</title></head><body>
+<h1 id="firstHeading" class="firstHeading">Open <i>Source</i> Geospatial</h1>
+<div id="mw-content-text"><div class="mw-parser-output">
+<p>The <b>OSGeo</b> Foundation supports <a href="/wiki/GDAL">GDAL</a>,
+<a href="/wiki/QGIS">QGIS</a>&nbsp;and <span class="x">Geo<em>Server</em></span>.</p>
+<ul><li>One</li>
+<li>Two  <code>ogr2ogr</code></li></ul>
+<table><tr><th>Project</th><td>PostGIS</td></tr></table>
+</div></div>
+</body></html>""",
+    "preformatted text": """<html><body>
+<h1 id="firstHeading">Build notes</h1>
+<div id="mw-content-text">
+<p>Run:</p>
+<pre>  ./configure
+    --with-proj
+
+make   install
+</pre>
+<textarea>  keep
+   this  </textarea>
+<p>Done.</p>
+</div>
+</body></html>""",
+    "scripts and styles": """<html><head><script>var head = 1;</script></head><body>
+<h1 id="firstHeading">Scripts</h1>
+<div id="mw-content-text">
+<style>.mw-parser-output { color: red; }</style>
+<p>Visible <script>document.write("hidden")</script>text.</p>
+<template><p>Template text</p></template>
+<p><ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby> reading</p>
+<noscript>No script fallback</noscript>
+</div>
+</body></html>""",
+    "comments": """<html><body>
+<!-- page header -->
+<h1 id="firstHeading"><!-- title -->Comments</h1>
+<div id="mw-content-text">
+<!-- NewPP limit report
+Cached time: 20240101000000
+-->
+<p>Before<!-- inline -->after.</p>
+</div>
+</body></html>""",
+    "catlinks": """<html><body>
+<h1 id="firstHeading"><span>Categorised</span>
+   <span>page</span></h1>
+<div id="mw-content-text"><p>Body text.</p></div>
+<div id="catlinks" class="catlinks"><div id="mw-normal-catlinks">
+<a href="/wiki/Special:Categories" title="Special:Categories">Categories</a>:
+<ul><li><a href="/wiki/Category:Board">Board</a></li>
+<li><a href="/wiki/Category:Events"> Code <b>Sprint</b> </a></li>
+<li><a href="/wiki/Category:Meetings"><b>Board</b>   <i>Meetings</i></a></li>
+<li><a href="/wiki/Category:Hidden">Category:Hidden</a></li>
+<li><a href="/wiki/Category:Empty"></a></li></ul>
+</div></div>
+<div id="catlinks"><a href="/wiki/Category:Second">Second block</a></div>
+</body></html>""",
+    "missing title": """<html><body>
+<div id="mw-content-text"><p>Content without a heading.</p></div>
+</body></html>""",
+    "missing content": """<html><body>
+<h1 id="firstHeading">No content</h1>
+<div id="bodyContent"><p>Elsewhere.</p></div>
+</body></html>""",
+    "non-ASCII": """<html><body>
+<h1 id="firstHeading">Café Ünïcode</h1>
+<div id="mw-content-text"><p>Straße, São Paulo &amp; Zürich &#8212; 東京</p></div>
+</body></html>""",
+}
+
+
+def make_response(html, encoding='utf-8'):
+    """Build a stand-in for the requests response the parse methods read"""
+    return types.SimpleNamespace(content=html.encode(encoding), encoding=encoding)
+
+
+def parse_both(html, encoding='utf-8'):
+    """Return the lxml and BeautifulSoup extractions of a page"""
+    # The parse methods do not use the crawler's state, so skip __init__ and
+    # its output directory
+    page_crawler = crawler.SimpleOSGeoWikiCrawler.__new__(crawler.SimpleOSGeoWikiCrawler)
+    url = "https://wiki.osgeo.org/wiki/Test"
+    return (page_crawler._parse_page_lxml(url, make_response(html, encoding)),
+            page_crawler._parse_page_soup(url, make_response(html, encoding)))
+
+
+def test_lxml_matches_soup():
+    if crawler.lxml_html is None:
+        print("lxml is not installed, nothing to compare")
+        return
+    for name, html in FIXTURES.items():
+        lxml_page, soup_page = parse_both(html)
+        assert lxml_page == soup_page, f"{name}: {lxml_page!r} != {soup_page!r}"
+
+
+def test_lxml_matches_soup_latin1():
+    if crawler.lxml_html is None:
+        return
+    lxml_page, soup_page = parse_both(FIXTURES["non-ASCII"].replace(" &#8212; 東京", ""), 'iso-8859-1')
+    assert lxml_page == soup_page, f"{lxml_page!r} != {soup_page!r}"
+
+
+def main():
+    if crawler.lxml_html is None:
+        print("lxml is not installed, nothing to compare")
+        return 0
+
+    print("Crawler Parse Path Comparison")
+    print("=" * 60)
+
+    failures = 0
+    for name, html in FIXTURES.items():
+        lxml_page, soup_page = parse_both(html)
+        if lxml_page == soup_page:
+            print(f"✓ {name}")
+        else:
+            failures += 1
+            print(f"✗ {name}")
+            print(f"    lxml: {lxml_page!r}")
+            print(f"    soup: {soup_page!r}")
+
+    print("=" * 60)
+    print(f"{len(FIXTURES) - failures}/{len(FIXTURES)} pages identical")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())